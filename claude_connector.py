@@ -6,18 +6,248 @@ via the Anthropic API.
 """
 
 import os
-import json
-import requests
+import time
+import asyncio
+import hashlib
+import importlib.util
+import httpx
+import orjson
 import logging
-from typing import Dict, Any, Optional, List
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Union, Iterator
+
+# Semantic caching needs NumPy and sentence-transformers (optional)
+try:
+    import numpy as np
+    SEMANTIC_CACHE_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+except ImportError:
+    SEMANTIC_CACHE_AVAILABLE = False
 
 # Configure logging
 logger = logging.getLogger("claude_connector")
 
+# Transient API errors that are retried with exponential backoff
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 5
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+class SemanticCache:
+    """Response cache that matches prompts by embedding similarity"""
+    
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, threshold: float = 0.87,
+                 max_entries: int = 1024):
+        """
+        Initialize the semantic cache
+        
+        Args:
+            model_name: sentence-transformers model used to embed prompts
+            threshold: Minimum cosine similarity for a cached response to be reused
+            max_entries: Maximum number of cached responses (least recently used are evicted)
+        """
+        if not SEMANTIC_CACHE_AVAILABLE:
+            raise ImportError("Semantic caching requires numpy and sentence-transformers")
+        
+        from sentence_transformers import SentenceTransformer
+        
+        self.model_name = model_name
+        self.encoder = SentenceTransformer(model_name)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        
+        # Normalized embeddings, one int8-quantized row per cached prompt with
+        # its float32 scale, plus parallel lists
+        dim = self.encoder.get_sentence_embedding_dimension()
+        self.embeddings = np.empty((0, dim), dtype=np.int8)
+        self.scales = np.empty(0, dtype=np.float32)
+        self.prompts: List[str] = []
+        self.responses: List[Dict[str, Any]] = []
+        self.last_used = np.empty(0, dtype=np.int64)
+        self._clock = 0
+        self.stats = {"hits": 0, "misses": 0}
+        
+        # Scope of each entry; a lookup only matches entries of its own scope
+        self.scopes = np.empty(0, dtype=object)
+        
+    @classmethod
+    def warm_cache(cls, prompts_responses: List[tuple], scope: str = "", **kwargs) -> "SemanticCache":
+        """
+        Create a semantic cache pre-populated with known responses
+        
+        Args:
+            prompts_responses: List of (prompt, response) tuples
+            scope: Scope the responses are cached under (see lookup)
+            **kwargs: Arguments passed to the SemanticCache constructor
+            
+        Returns:
+            Populated SemanticCache
+        """
+        cache = cls(**kwargs)
+        
+        if prompts_responses:
+            prompts, responses = zip(*prompts_responses)
+            cache.add_many(list(prompts), list(responses), scope=scope)
+        
+        return cache
+    
+    @staticmethod
+    def quantize(vectors: "np.ndarray"):
+        """
+        Quantize float vectors to int8 with one scale per vector
+        
+        Args:
+            vectors: Vector or matrix (one vector per row) of floats
+            
+        Returns:
+            Tuple of (int8 values, float32 scales) such that values * scale ~= vectors
+        """
+        max_abs = np.abs(vectors).max(axis=-1, keepdims=True)
+        max_abs[max_abs == 0] = 1.0
+        values = np.clip(np.round(vectors * (127.0 / max_abs)), -127, 127).astype(np.int8)
+        scales = (max_abs / 127.0).astype(np.float32).squeeze(-1)
+        return values, scales
+    
+    def embed(self, text: str) -> "np.ndarray":
+        """Embed a prompt as a normalized float32 vector"""
+        return np.asarray(self.encoder.encode(text, normalize_embeddings=True), dtype=np.float32)
+    
+    def embed_many(self, texts: List[str], batch_size: int = 64) -> "np.ndarray":
+        """Embed several prompts in batched forward passes, one normalized row per prompt"""
+        embeddings = self.encoder.encode(
+            texts,
+            batch_size=batch_size,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return np.asarray(embeddings, dtype=np.float32).reshape(len(texts), -1)
+    
+    def lookup(self, embedding: "np.ndarray", scope: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Find the cached response most similar to an embedded prompt
+        
+        Args:
+            embedding: Normalized prompt embedding (see embed)
+            scope: Only entries added under this scope can match, e.g. a hash
+                of the request settings the response depends on
+            
+        Returns:
+            Copy of the cached response, or None if nothing is similar enough
+        """
+        if len(self.responses) == 0:
+            self.stats["misses"] += 1
+            return None
+        
+        # Embeddings are normalized, so the dot product is the cosine similarity.
+        # Accumulate the int8 products in int32, then rescale.
+        query, query_scale = self.quantize(embedding)
+        sims = np.matmul(self.embeddings, query, dtype=np.int32) * (self.scales * query_scale)
+        sims[self.scopes != scope] = -np.inf
+        best = int(sims.argmax())
+        
+        if sims[best] < self.threshold:
+            self.stats["misses"] += 1
+            return None
+        
+        self._clock += 1
+        self.last_used[best] = self._clock
+        self.stats["hits"] += 1
+        return dict(self.responses[best])
+    
+    def add(self, prompt: str, embedding: "np.ndarray", response: Dict[str, Any], scope: str = ""):
+        """
+        Cache a response for an embedded prompt
+        
+        Args:
+            prompt: Original prompt text
+            embedding: Normalized prompt embedding (see embed)
+            response: Response dict to reuse for similar prompts
+            scope: Scope the response is cached under (see lookup)
+        """
+        if self.max_entries <= 0:
+            return
+        
+        if len(self.responses) >= self.max_entries:
+            oldest = int(self.last_used.argmin())
+            self.embeddings = np.delete(self.embeddings, oldest, axis=0)
+            self.scales = np.delete(self.scales, oldest)
+            self.last_used = np.delete(self.last_used, oldest)
+            self.scopes = np.delete(self.scopes, oldest)
+            del self.prompts[oldest]
+            del self.responses[oldest]
+        
+        self._clock += 1
+        values, scale = self.quantize(embedding)
+        self.embeddings = np.vstack([self.embeddings, values[np.newaxis, :]])
+        self.scales = np.append(self.scales, scale)
+        self.last_used = np.append(self.last_used, self._clock)
+        self.scopes = np.append(self.scopes, np.array([scope], dtype=object))
+        self.prompts.append(prompt)
+        self.responses.append(dict(response))
+        
+    def add_many(self, prompts: List[str], responses: List[Dict[str, Any]], scope: str = ""):
+        """
+        Cache several responses, embedding all prompts in a single batch
+        
+        Args:
+            prompts: Prompt texts
+            responses: Response dicts, in the same order as prompts
+            scope: Scope the responses are cached under (see lookup)
+        """
+        if not prompts:
+            return
+        
+        embeddings = self.embed_many(prompts)
+        
+        for prompt, embedding, response in zip(prompts, embeddings, responses):
+            self.add(prompt, embedding, response, scope)
+    
+    def switch_model(self, model_name: str):
+        """
+        Switch to a different embedding model, keeping cached responses
+        
+        All cached prompts are re-embedded with the new model in one batch
+        before the old embeddings are replaced, so lookups never mix vectors
+        from different models.
+        
+        Args:
+            model_name: sentence-transformers model to use from now on
+        """
+        from sentence_transformers import SentenceTransformer
+        
+        encoder = SentenceTransformer(model_name)
+        
+        if self.prompts:
+            embeddings = encoder.encode(
+                self.prompts,
+                batch_size=64,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )
+            values, scales = self.quantize(np.asarray(embeddings, dtype=np.float32).reshape(len(self.prompts), -1))
+        else:
+            values = np.empty((0, encoder.get_sentence_embedding_dimension()), dtype=np.int8)
+            scales = np.empty(0, dtype=np.float32)
+        
+        self.encoder = encoder
+        self.model_name = model_name
+        self.embeddings = values
+        self.scales = scales
+    
+    def clear(self):
+        """Drop all cached responses and reset statistics"""
+        self.embeddings = self.embeddings[:0]
+        self.scales = self.scales[:0]
+        self.last_used = self.last_used[:0]
+        self.scopes = self.scopes[:0]
+        self.prompts = []
+        self.responses = []
+        self.stats = {"hits": 0, "misses": 0}
+
 class ClaudeConnector:
     """Connector for Anthropic's Claude models"""
     
-    def __init__(self, api_key: str, model_id: str = "claude-3-5-sonnet-20240620", base_url: str = "https://api.anthropic.com"):
+    def __init__(self, api_key: str, model_id: str = "claude-3-5-sonnet-20240620", base_url: str = "https://api.anthropic.com",
+                 cache_size: int = 1024, semantic_cache: Optional[SemanticCache] = None):
         """
         Initialize Claude connector
         
@@ -25,6 +255,8 @@ class ClaudeConnector:
             api_key: Anthropic API key
             model_id: Claude model version (e.g., "claude-3-5-sonnet-20240620")
             base_url: API base URL
+            cache_size: Maximum number of deterministic responses to cache (0 disables caching)
+            semantic_cache: Optional SemanticCache used to reuse responses for similar prompts
         """
         self.api_key = api_key
         self.model_id = model_id
@@ -35,63 +267,546 @@ class ClaudeConnector:
             "content-type": "application/json"
         }
         
-    def generate(self, prompt: str, max_tokens: int = 1000, temperature: float = 0.7) -> Dict[str, Any]:
+        # Pooled keep-alive client; HTTP/2 lets concurrent calls share one connection
+        self.client = httpx.Client(
+            base_url=self.base_url,
+            headers=self.headers,
+            http2=True,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=20),
+            timeout=httpx.Timeout(5.0, read=60.0)
+        )
+        
+        # Async client for agenerate(), created lazily on first use
+        self._aclient: Optional[httpx.AsyncClient] = None
+        
+        # Exact-match response cache (LRU), only used for temperature == 0
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0}
+        self.semantic_cache = semantic_cache
+        
+    def close(self):
+        """
+        Close the underlying HTTP connection pools
+        
+        The async client used by agenerate() is bound to the event loop it
+        ran on, so async users should await aclose() (or use "async with")
+        before that loop ends. Any async client still open here is closed on
+        a fresh loop where possible, and reported otherwise.
+        """
+        self.client.close()
+        
+        if self._aclient is None:
+            return
+        
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            try:
+                asyncio.run(self.aclose())
+                return
+            except Exception as e:
+                logger.debug("Could not close async client outside its event loop: %s", e)
+        
+        logger.warning("ClaudeConnector closed with its async client still open; await aclose() to release it")
+        self._aclient = None
+        
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+        self.client.close()
+        
+    def _cache_key(self, payload: Dict[str, Any]) -> Optional[str]:
+        """Build a cache key for a request payload, or None if it must not be cached"""
+        if self.cache_size <= 0 or payload.get("temperature") != 0:
+            return None
+        
+        canonical = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+        return hashlib.sha256(canonical).hexdigest()
+    
+    def _cache_get(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Look up a cached response and mark it as most recently used"""
+        if key is None:
+            return None
+        
+        result = self._cache.get(key)
+        
+        if result is None:
+            self.stats["misses"] += 1
+            return None
+        
+        self._cache.move_to_end(key)
+        self.stats["hits"] += 1
+        return dict(result)
+    
+    def _cache_put(self, key: Optional[str], result: Dict[str, Any]):
+        """Store a successful response, evicting the least recently used entry if full"""
+        if key is None or not result.get("success", False):
+            return
+        
+        self._cache[key] = dict(result)
+        self._cache.move_to_end(key)
+        
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+    
+    def clear_cache(self):
+        """Drop all cached responses and reset cache statistics"""
+        self._cache.clear()
+        self.stats = {"hits": 0, "misses": 0}
+        
+    def _build_payload(self, prompt: str, max_tokens: int, temperature: float,
+                       system: Optional[Union[str, List[Dict[str, Any]]]] = None) -> Dict[str, Any]:
+        """
+        Build the Messages API request body
+        
+        Static content belongs in system, which is sent ahead of the user
+        message. A plain string system prompt is marked as a prompt-cache
+        breakpoint so repeated requests reuse Anthropic's cached prefix.
+        """
+        payload = {
+            "model": self.model_id,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ]
+        }
+        
+        if isinstance(system, str):
+            system = [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+        
+        if system:
+            payload["system"] = system
+        
+        return payload
+    
+    def _check_caches(self, prompt: str, payload: Dict[str, Any]):
+        """
+        Look up a request in the exact-match and semantic caches
+        
+        Returns:
+            Tuple of (cached response or None, exact cache key, semantic key).
+            The semantic key is a (scope, prompt embedding) pair, or None when
+            the semantic cache does not apply.
+        """
+        cache_key = self._cache_key(payload)
+        cached = self._cache_get(cache_key)
+        
+        if cached is not None:
+            return cached, cache_key, None
+        
+        semantic_key = None
+        
+        # Like the exact cache, only deterministic requests are reused. Entries
+        # are scoped by everything except the prompt (model, system prompt,
+        # sampling settings), so only the prompt is matched by similarity.
+        if self.semantic_cache is not None and payload.get("temperature") == 0:
+            settings = {key: value for key, value in payload.items() if key != "messages"}
+            scope = hashlib.sha256(orjson.dumps(settings, option=orjson.OPT_SORT_KEYS)).hexdigest()
+            semantic_key = (scope, self.semantic_cache.embed(prompt))
+            cached = self.semantic_cache.lookup(semantic_key[1], scope)
+        
+        return cached, cache_key, semantic_key
+    
+    def _handle_result(self, result: Dict[str, Any], prompt: str, cache_key: Optional[str],
+                       semantic_key) -> Dict[str, Any]:
+        """Convert a Messages API response into a result dict and populate the caches"""
+        # Extract the text response
+        if "content" in result and len(result["content"]) > 0:
+            response_text = result["content"][0]["text"]
+            generated = {
+                "success": True,
+                "response": response_text,
+                "model_id": self.model_id,
+                "usage": result.get("usage", {})
+            }
+            self._cache_put(cache_key, generated)
+            
+            if semantic_key is not None:
+                scope, embedding = semantic_key
+                self.semantic_cache.add(prompt, embedding, generated, scope)
+            
+            return generated
+        else:
+            return {
+                "success": False,
+                "error": "No content in response",
+                "raw_response": result
+            }
+    
+    def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request, retrying transient API errors with exponential backoff"""
+        for attempt in range(MAX_RETRIES + 1):
+            response = self.client.request(method, url, **kwargs)
+            
+            if response.status_code not in RETRY_STATUS_CODES or attempt == MAX_RETRIES:
+                return response
+            
+            time.sleep(0.5 * (2 ** attempt))
+    
+    def _iter_stream_events(self, payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Send a streaming Messages API request and yield its server-sent events"""
+        body = orjson.dumps({**payload, "stream": True})
+        
+        with self.client.stream("POST", "/v1/messages", content=body) as response:
+            response.raise_for_status()
+            
+            for line in response.iter_lines():
+                if line.startswith("data:"):
+                    event = orjson.loads(line[5:])
+                    
+                    if event.get("type") == "error":
+                        raise RuntimeError(event.get("error", {}).get("message", "Stream error"))
+                    
+                    yield event
+    
+    def _collect_stream(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Consume a streaming response into the same shape as a non-streaming one"""
+        chunks = []
+        usage = {}
+        
+        for event in self._iter_stream_events(payload):
+            event_type = event.get("type")
+            
+            if event_type == "content_block_delta":
+                text = event.get("delta", {}).get("text")
+                if text:
+                    chunks.append(text)
+            elif event_type == "message_start":
+                usage.update(event.get("message", {}).get("usage", {}))
+            elif event_type == "message_delta":
+                usage.update(event.get("usage", {}))
+        
+        if not chunks:
+            return {"usage": usage}
+        
+        return {"content": [{"type": "text", "text": "".join(chunks)}], "usage": usage}
+    
+    def generate_stream(self, prompt: str, max_tokens: int = 1000, temperature: float = 0.7,
+                        system: Optional[Union[str, List[Dict[str, Any]]]] = None) -> Iterator[str]:
+        """
+        Stream a response from Claude as it is generated
+        
+        Streaming calls bypass the response caches.
+        
+        Args:
+            prompt: User prompt
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature (0.0-1.0)
+            system: Optional static system prompt (string or list of content blocks)
+            
+        Yields:
+            Chunks of response text
+        """
+        payload = self._build_payload(prompt, max_tokens, temperature, system)
+        
+        for event in self._iter_stream_events(payload):
+            if event.get("type") == "content_block_delta":
+                text = event.get("delta", {}).get("text")
+                if text:
+                    yield text
+    
+    def generate(self, prompt: str, max_tokens: int = 1000, temperature: float = 0.7,
+                 system: Optional[Union[str, List[Dict[str, Any]]]] = None,
+                 stream: bool = False) -> Dict[str, Any]:
         """
         Generate a response from Claude
         
+        Responses for deterministic requests (temperature == 0) are served
+        from an in-memory LRU cache when an identical request was made before.
+        If a semantic cache is configured, responses to sufficiently similar
+        deterministic prompts with otherwise identical settings are reused as well.
+        
         Args:
             prompt: User prompt
             max_tokens: Maximum tokens to generate
             temperature: Sampling temperature (0.0-1.0)
+            system: Optional static system prompt (string or list of content blocks)
+            stream: Receive the response as server-sent events instead of one
+                JSON body (use generate_stream for incremental chunks)
             
         Returns:
             Dictionary with model response
         """
-        url = f"{self.base_url}/v1/messages"
+        payload = self._build_payload(prompt, max_tokens, temperature, system)
+        
+        cached, cache_key, semantic_key = self._check_caches(prompt, payload)
+        
+        if cached is not None:
+            return cached
         
         try:
-            payload = {
-                "model": self.model_id,
-                "max_tokens": max_tokens,
-                "temperature": temperature,
-                "messages": [
-                    {"role": "user", "content": prompt}
-                ]
+            if stream:
+                result = self._collect_stream(payload)
+            else:
+                response = self._request("POST", "/v1/messages", content=orjson.dumps(payload))
+                response.raise_for_status()
+                result = orjson.loads(response.content)
+            
+            return self._handle_result(result, prompt, cache_key, semantic_key)
+            
+        except httpx.HTTPError as e:
+            logger.error("Claude API error: %s", e)
+            return {
+                "success": False,
+                "error": f"API request error: {str(e)}"
             }
+        except Exception as e:
+            logger.error("Claude connector error: %s", e)
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
+    def _get_async_client(self) -> "httpx.AsyncClient":
+        """Get the connector's async HTTP client, creating it on first use"""
+        if self._aclient is None:
+            self._aclient = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                http2=True,
+                limits=httpx.Limits(max_connections=20),
+                timeout=httpx.Timeout(60.0, connect=5.0)
+            )
+        return self._aclient
+    
+    async def agenerate(self, prompt: str, max_tokens: int = 1000, temperature: float = 0.7,
+                       system: Optional[Union[str, List[Dict[str, Any]]]] = None) -> Dict[str, Any]:
+        """
+        Asynchronously generate a response from Claude
+        
+        Behaves like generate(), including caching, but does not block the
+        event loop while waiting for the API.
+        
+        Args:
+            prompt: User prompt
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature (0.0-1.0)
+            system: Optional static system prompt (string or list of content blocks)
             
-            response = requests.post(url, headers=self.headers, json=payload)
+        Returns:
+            Dictionary with model response
+        """
+        payload = self._build_payload(prompt, max_tokens, temperature, system)
+        
+        cached, cache_key, semantic_key = self._check_caches(prompt, payload)
+        
+        if cached is not None:
+            return cached
+        
+        try:
+            response = await self._get_async_client().post("/v1/messages", content=orjson.dumps(payload))
             response.raise_for_status()
-            result = response.json()
+            result = orjson.loads(response.content)
             
-            # Extract the text response
-            if "content" in result and len(result["content"]) > 0:
-                response_text = result["content"][0]["text"]
-                return {
-                    "success": True,
-                    "response": response_text,
-                    "model_id": self.model_id,
-                    "usage": result.get("usage", {})
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": "No content in response",
-                    "raw_response": result
-                }
+            return self._handle_result(result, prompt, cache_key, semantic_key)
             
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Claude API error: {str(e)}")
+        except httpx.HTTPError as e:
+            logger.error("Claude API error: %s", e)
             return {
                 "success": False,
                 "error": f"API request error: {str(e)}"
             }
         except Exception as e:
-            logger.error(f"Claude connector error: {str(e)}")
+            logger.error("Claude connector error: %s", e)
             return {
                 "success": False,
                 "error": str(e)
             }
     
+    async def agenerate_many(self, prompts: List[str], max_tokens: int = 1000, temperature: float = 0.7,
+                             max_concurrency: int = 8,
+                             system: Optional[Union[str, List[Dict[str, Any]]]] = None) -> List[Dict[str, Any]]:
+        """
+        Generate responses for several independent prompts concurrently
+        
+        Args:
+            prompts: User prompts
+            max_tokens: Maximum tokens to generate per prompt
+            temperature: Sampling temperature (0.0-1.0)
+            max_concurrency: Maximum number of requests in flight at once
+            system: Optional static system prompt shared by all prompts
+            
+        Returns:
+            List of response dictionaries, in the same order as prompts
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def generate_one(prompt: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.agenerate(prompt, max_tokens=max_tokens, temperature=temperature, system=system)
+        
+        results = await asyncio.gather(*(generate_one(p) for p in prompts), return_exceptions=True)
+        
+        return [
+            {"success": False, "error": str(r)} if isinstance(r, BaseException) else r
+            for r in results
+        ]
+    
+    async def aclose(self):
+        """Close the async HTTP client, if one was created"""
+        if self._aclient is not None:
+            await self._aclient.aclose()
+            self._aclient = None
+    
+    def batch_generate(self, prompts: List[str], max_tokens: int = 1000, temperature: float = 0.7,
+                       system: Optional[Union[str, List[Dict[str, Any]]]] = None,
+                       poll_interval: float = 10.0, timeout: float = 24 * 60 * 60) -> List[Dict[str, Any]]:
+        """
+        Generate responses for many prompts with the Message Batches API
+        
+        Batches are billed at a discount but may take minutes to hours to
+        complete, so this is meant for throughput-bound work only. Prompts
+        already in the response caches are not submitted.
+        
+        Args:
+            prompts: User prompts
+            max_tokens: Maximum tokens to generate per prompt
+            temperature: Sampling temperature (0.0-1.0)
+            system: Optional static system prompt shared by all prompts
+            poll_interval: Seconds to wait between batch status checks
+            timeout: Maximum number of seconds to wait for the batch to end
+            
+        Returns:
+            List of response dictionaries, in the same order as prompts
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(prompts)
+        pending = {}
+        
+        for i, prompt in enumerate(prompts):
+            payload = self._build_payload(prompt, max_tokens, temperature, system)
+            cached, cache_key, semantic_key = self._check_caches(prompt, payload)
+            
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending[f"prompt-{i}"] = (i, payload, cache_key, semantic_key)
+        
+        if not pending:
+            return results
+        
+        url = "/v1/messages/batches"
+        
+        try:
+            # Submit all uncached prompts as a single batch job
+            body = orjson.dumps({
+                "requests": [
+                    {"custom_id": custom_id, "params": payload}
+                    for custom_id, (_, payload, _, _) in pending.items()
+                ]
+            })
+            response = self._request("POST", url, content=body)
+            response.raise_for_status()
+            batch = orjson.loads(response.content)
+            
+            # Poll until processing has ended
+            deadline = time.monotonic() + timeout
+            
+            while batch.get("processing_status") != "ended":
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Message batch {batch.get('id')} did not finish within {timeout} seconds")
+                
+                time.sleep(poll_interval)
+                response = self._request("GET", f"{url}/{batch['id']}")
+                response.raise_for_status()
+                batch = orjson.loads(response.content)
+            
+            # Download the JSONL results and map them back to the prompts
+            response = self._request("GET", batch["results_url"], timeout=httpx.Timeout(5.0, read=300.0))
+            response.raise_for_status()
+            
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                
+                entry = orjson.loads(line)
+                
+                if entry.get("custom_id") not in pending:
+                    continue
+                
+                i, _, cache_key, semantic_key = pending[entry["custom_id"]]
+                outcome = entry.get("result", {})
+                
+                if outcome.get("type") == "succeeded":
+                    results[i] = self._handle_result(outcome.get("message", {}), prompts[i], cache_key, semantic_key)
+                else:
+                    results[i] = {
+                        "success": False,
+                        "error": f"Batch request {outcome.get('type', 'failed')}: {outcome.get('error')}"
+                    }
+            
+        except httpx.HTTPError as e:
+            logger.error("Claude batch API error: %s", e)
+            error = f"API request error: {str(e)}"
+        except Exception as e:
+            logger.error("Claude batch error: %s", e)
+            error = str(e)
+        else:
+            error = "No result returned for prompt"
+        
+        return [
+            r if r is not None else {"success": False, "error": error}
+            for r in results
+        ]
+    
+    def generate_many(self, prompts: List[str], max_tokens: int = 1000, temperature: float = 0.7,
+                      system: Optional[Union[str, List[Dict[str, Any]]]] = None,
+                      use_batch_api: bool = False, max_concurrency: int = 8) -> List[Dict[str, Any]]:
+        """
+        Generate responses for several independent prompts
+        
+        Args:
+            prompts: User prompts
+            max_tokens: Maximum tokens to generate per prompt
+            temperature: Sampling temperature (0.0-1.0)
+            system: Optional static system prompt shared by all prompts
+            use_batch_api: Use the discounted, high-latency Message Batches API
+                instead of concurrent requests
+            max_concurrency: Maximum number of concurrent requests (ignored for batches)
+            
+        Returns:
+            List of response dictionaries, in the same order as prompts
+            
+        Raises:
+            RuntimeError: If called while an event loop is running in this
+                thread (unless use_batch_api is set); await agenerate_many
+                there instead
+        """
+        if use_batch_api:
+            return self.batch_generate(prompts, max_tokens=max_tokens, temperature=temperature, system=system)
+        
+        # The concurrent path runs its own event loop with asyncio.run
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError("generate_many cannot be called from a running event loop; await agenerate_many instead")
+        
+        async def run() -> List[Dict[str, Any]]:
+            try:
+                return await self.agenerate_many(
+                    prompts,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    max_concurrency=max_concurrency,
+                    system=system
+                )
+            finally:
+                # The async client is bound to this event loop
+                await self.aclose()
+        
+        return asyncio.run(run())
+    
     def health_check(self) -> Dict[str, Any]:
         """
         Check if the API is accessible
@@ -100,8 +815,12 @@ class ClaudeConnector:
             Dictionary with health status
         """
         try:
-            # Simple prompt to test connectivity
-            result = self.generate("Hello, Claude. Please respond with only the word 'OK'.", max_tokens=10)
+            # Simple deterministic prompt to test connectivity. Sent straight to
+            # the API: a reply from the response cache would prove nothing
+            payload = self._build_payload("Hello, Claude. Please respond with only the word 'OK'.", 10, 0)
+            response = self._request("POST", "/v1/messages", content=orjson.dumps(payload))
+            response.raise_for_status()
+            result = self._handle_result(orjson.loads(response.content), payload["messages"][0]["content"], None, None)
             
             if result.get("success", False):
                 return {
@@ -132,6 +851,9 @@ def create_claude_connector(config: Dict[str, Any]) -> Optional[ClaudeConnector]
             - api_key: Anthropic API key
             - model_id: (optional) Claude model version
             - base_url: (optional) API base URL
+            - cache_size: (optional) Size of the deterministic response cache
+            - semantic_cache: (optional) True to enable the embedding-based cache
+            - semantic_threshold: (optional) Cosine similarity threshold for semantic hits
             
     Returns:
         ClaudeConnector instance or None if config is invalid
@@ -145,9 +867,19 @@ def create_claude_connector(config: Dict[str, Any]) -> Optional[ClaudeConnector]
             
         model_id = config.get("model_id", "claude-3-5-sonnet-20240620")
         base_url = config.get("base_url", "https://api.anthropic.com")
+        cache_size = config.get("cache_size", 1024)
+        
+        semantic_cache = None
+        
+        if config.get("semantic_cache", False):
+            if SEMANTIC_CACHE_AVAILABLE:
+                semantic_cache = SemanticCache(threshold=config.get("semantic_threshold", 0.87))
+            else:
+                logger.warning("Semantic cache requested but numpy/sentence-transformers are not installed")
         
-        return ClaudeConnector(api_key, model_id, base_url)
+        return ClaudeConnector(api_key, model_id, base_url, cache_size=cache_size,
+                               semantic_cache=semantic_cache)
         
     except Exception as e:
-        logger.error(f"Error creating Claude connector: {str(e)}")
+        logger.error("Error creating Claude connector: %s", e)
         return None
@@ -0,0 +1,29 @@
+"""
+Command runner for the MCP server's spawn pool
+
+Helper processes in the optional spawn pool (MCP_SPAWN_POOL_SIZE) import
+this module to run system commands. It must stay free of import-time side
+effects so helpers never open log files or install signal handlers.
+"""
+
+import subprocess
+from typing import Dict, List, Any, Optional
+
+def run_command_blocking(cmd: List[str], cwd: Optional[str], timeout: Optional[int]) -> Dict[str, Any]:
+    """Run a command to completion; executed inside a spawn pool helper process"""
+    try:
+        completed = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {
+            "success": False,
+            "error": f"Command timed out after {timeout} seconds"
+        }
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+    
+    return {
+        "success": completed.returncode == 0,
+        "returncode": completed.returncode,
+        "stdout": completed.stdout.decode(errors="replace"),
+        "stderr": completed.stderr.decode(errors="replace")
+    }
@@ -7,12 +7,22 @@ to interact with your system and perform tasks autonomously.
 
 import os
 import sys
-import json
+import asyncio
+import re
+import copy
 import time
+import hashlib
 import logging
-from typing import Dict, List, Any, Optional
+import orjson
+from typing import Dict, List, Any, Optional, Iterator, Tuple
 from mcp_client import MCPClient
 
+# Semantic plan caching is optional (requires numpy and sentence-transformers)
+try:
+    from claude_connector import SemanticCache, SEMANTIC_CACHE_AVAILABLE
+except ImportError:
+    SEMANTIC_CACHE_AVAILABLE = False
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -24,13 +34,115 @@ logging.basicConfig(
 )
 logger = logging.getLogger("ai_agent")
 
+# Maximum number of characters of command output written to the log
+MAX_LOGGED_OUTPUT = 4096
+
+# (task type, operation) pairs that have no side effects and may run concurrently
+TASK_READONLY = {("file_operation", "read")}
+
+# Lines of system information that change between otherwise identical states
+VOLATILE_SYSTEM_INFO = re.compile(r"^.*(boot time|up time|uptime).*$\n?", re.IGNORECASE | re.MULTILINE)
+
+# Static planning instructions, sent as the system prompt so that model
+# backends can reuse their cached prefix across planning calls
+PLANNING_SYSTEM_PROMPT = """
+You are a planning assistant for an autonomous agent that controls a computer.
+
+Based on the goal and current system state, create a detailed plan with specific steps to achieve the goal.
+Each step should be one of the following types: command, file_operation, or program_control.
+
+Return the plan as a JSON array of tasks, where each task has the following structure:
+{
+    "type": "command | file_operation | program_control",
+    "description": "Description of the task",
+    "params": {
+        // Parameters specific to the task type
+    }
+}
+
+ONLY RETURN THE JSON ARRAY WITHOUT ANY ADDITIONAL TEXT OR EXPLANATION.
+"""
+
+def iter_json_array_spans(text: str, start: int = 0) -> Iterator[Tuple[int, int]]:
+    """
+    Find candidate top-level JSON arrays in a text in a single pass.
+    
+    Brackets inside JSON strings are ignored, so a "]" in a string
+    literal does not end the array.
+    
+    Args:
+        text: Text to scan
+        start: Index to start scanning from
+        
+    Yields:
+        (start, end) slice indices of each balanced top-level array
+    """
+    depth = 0
+    array_start = -1
+    in_string = False
+    escape = False
+    
+    for i in range(start, len(text)):
+        ch = text[i]
+        
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == "[":
+            if depth == 0:
+                array_start = i
+            depth += 1
+        elif depth > 0:
+            if ch == '"':
+                in_string = True
+            elif ch == "]":
+                depth -= 1
+                if depth == 0:
+                    yield array_start, i + 1
+
+def extract_json_array(text: str) -> Optional[List[Any]]:
+    """
+    Extract the first parseable JSON array from a model response.
+    
+    Args:
+        text: Model response, possibly with surrounding prose
+        
+    Returns:
+        Parsed array, or None if no valid JSON array was found
+    """
+    for array_start, array_end in iter_json_array_spans(text):
+        try:
+            result = orjson.loads(text[array_start:array_end])
+        except orjson.JSONDecodeError:
+            continue
+        
+        if isinstance(result, list):
+            return result
+    
+    # Fall back to the widest bracketed span
+    json_start = text.find("[")
+    json_end = text.rfind("]") + 1
+    
+    if json_start >= 0 and json_end > json_start:
+        try:
+            return orjson.loads(text[json_start:json_end])
+        except orjson.JSONDecodeError as e:
+            logger.error("Failed to parse JSON from model response: %s", e)
+    
+    return None
+
 class AIAgent:
     """
     An autonomous AI agent that uses the MCP server to interact with the system
     and perform tasks based on high-level goals.
     """
     
-    def __init__(self, server_url: str, api_key: str, model_id: str):
+    def __init__(self, server_url: str, api_key: str, model_id: str,
+                 use_plan_cache: bool = False, state_ttl: float = 10.0, max_concurrency: int = 4):
         """
         Initialize the AI agent.
         
@@ -38,11 +150,33 @@ class AIAgent:
             server_url: URL of the MCP server
             api_key: API key for authentication
             model_id: ID of the AI model to use for reasoning
+            use_plan_cache: Reuse plans made for semantically similar goals
+            state_ttl: Seconds for which an analyzed system state is reused
+            max_concurrency: Maximum number of read-only tasks executed at once
         """
         self.client = MCPClient(server_url, api_key)
         self.model_id = model_id
         self.working_dir = os.getcwd()
         self.tasks = []
+        self.max_concurrency = max_concurrency
+        
+        # Goal embedding -> planned tasks
+        self._plan_cache = None
+        if use_plan_cache:
+            if SEMANTIC_CACHE_AVAILABLE:
+                self._plan_cache = SemanticCache(threshold=0.9)
+            else:
+                logger.warning("Plan cache requested but numpy/sentence-transformers are not installed")
+        
+        # (timestamp, system_state) of the last analysis
+        self.state_ttl = state_ttl
+        self._state_cache = None
+        
+        # Output of uname/systeminfo, fetched once
+        self._system_info = None
+        
+        # Short hash of the last system state sent to the model
+        self.state_version = None
         
     def connect(self) -> bool:
         """
@@ -55,13 +189,13 @@ class AIAgent:
         result = self.client.list_models()
         
         if not result.get("success", False):
-            logger.error(f"Failed to list models: {result.get('error')}")
+            logger.error("Failed to list models: %s", result.get('error'))
             return False
         
         models = result.get("models", [])
         
         if any(model["model_id"] == self.model_id for model in models):
-            logger.info(f"Model {self.model_id} is already connected")
+            logger.info("Model %s is already connected", self.model_id)
             return True
         
         # Connect to the model
@@ -72,26 +206,27 @@ class AIAgent:
         )
         
         if not result.get("success", False):
-            logger.error(f"Failed to connect to model {self.model_id}: {result.get('error')}")
+            logger.error("Failed to connect to model %s: %s", self.model_id, result.get('error'))
             return False
         
-        logger.info(f"Successfully connected to model {self.model_id}")
+        logger.info("Successfully connected to model %s", self.model_id)
         return True
     
-    def query_model(self, prompt: str) -> str:
+    def query_model(self, prompt: str, system_prompt: str = None) -> str:
         """
         Query the AI model for reasoning.
         
         Args:
             prompt: The prompt to send to the model
+            system_prompt: Optional static instructions sent ahead of the prompt
             
         Returns:
             The model's response as a string
         """
-        result = self.client.query_model(self.model_id, self.model_id, prompt)
+        result = self.client.query_model(self.model_id, self.model_id, prompt, system_prompt)
         
         if not result.get("success", False):
-            logger.error(f"Failed to query model: {result.get('error')}")
+            logger.error("Failed to query model: %s", result.get('error'))
             return ""
         
         return result.get("response", "")
@@ -127,7 +262,7 @@ class AIAgent:
         result = self.client.read_file(self.model_id, path)
         
         if not result.get("success", False):
-            logger.error(f"Failed to read file {path}: {result.get('error')}")
+            logger.error("Failed to read file %s: %s", path, result.get('error'))
             return ""
         
         return result.get("content", "")
@@ -146,7 +281,7 @@ class AIAgent:
         result = self.client.write_file(self.model_id, path, content)
         
         if not result.get("success", False):
-            logger.error(f"Failed to write to file {path}: {result.get('error')}")
+            logger.error("Failed to write to file %s: %s", path, result.get('error'))
             return False
         
         return True
@@ -165,7 +300,7 @@ class AIAgent:
         result = self.client.start_program(self.model_id, program_path, args)
         
         if not result.get("success", False):
-            logger.error(f"Failed to start program {program_path}: {result.get('error')}")
+            logger.error("Failed to start program %s: %s", program_path, result.get('error'))
             return None
         
         return result.get("pid")
@@ -183,18 +318,13 @@ class AIAgent:
         result = self.client.stop_program(self.model_id, pid)
         
         if not result.get("success", False):
-            logger.error(f"Failed to stop program with PID {pid}: {result.get('error')}")
+            logger.error("Failed to stop program with PID %s: %s", pid, result.get('error'))
             return False
         
         return True
     
-    def analyze_system_state(self) -> Dict:
-        """
-        Analyze the current system state.
-        
-        Returns:
-            Dictionary with system state information
-        """
+    def _dynamic_system_info(self) -> Dict:
+        """Collect the parts of the system state that change over time"""
         system_state = {}
         
         # Get current directory files
@@ -207,16 +337,72 @@ class AIAgent:
         if ps_result.get("success", False):
             system_state["processes"] = ps_result.get("stdout", "")
         
-        # Get system info
-        if sys.platform == "win32":
-            sys_info_result = self.execute_command("systeminfo")
-        else:
-            sys_info_result = self.execute_command("uname", ["-a"])
+        return system_state
+    
+    def _static_system_info(self) -> Optional[str]:
+        """Get the OS/host description, which cannot change while the agent runs"""
+        if self._system_info is None:
+            if sys.platform == "win32":
+                sys_info_result = self.execute_command("systeminfo")
+            else:
+                sys_info_result = self.execute_command("uname", ["-a"])
+            
+            # Only successful results are remembered
+            if sys_info_result.get("success", False):
+                self._system_info = sys_info_result.get("stdout", "")
         
-        if sys_info_result.get("success", False):
-            system_state["system_info"] = sys_info_result.get("stdout", "")
+        return self._system_info
+    
+    def analyze_system_state(self) -> Dict:
+        """
+        Analyze the current system state.
         
-        return system_state
+        The result is reused for state_ttl seconds to avoid re-running the
+        underlying commands on every planning call.
+        
+        Returns:
+            Dictionary with system state information
+        """
+        if self._state_cache is not None:
+            timestamp, cached_state = self._state_cache
+            if time.monotonic() - timestamp < self.state_ttl:
+                return dict(cached_state)
+        
+        system_state = self._dynamic_system_info()
+        
+        system_info = self._static_system_info()
+        if system_info is not None:
+            system_state["system_info"] = system_info
+        
+        self._state_cache = (time.monotonic(), system_state)
+        return dict(system_state)
+    
+    def render_system_state(self, system_state: Dict) -> str:
+        """
+        Render the system state deterministically for use in a prompt.
+        
+        Files are sorted and volatile lines (boot time, uptime) are removed,
+        so identical states always produce identical prompt text and can be
+        served from prompt caches. The hash of the rendered text is stored
+        in state_version.
+        
+        Args:
+            system_state: System state from analyze_system_state
+            
+        Returns:
+            Rendered system state text
+        """
+        files = sorted(
+            system_state.get("files", []),
+            key=lambda f: f.get("name", "") if isinstance(f, dict) else str(f)
+        )
+        files_text = "\n".join(f"- {f}" for f in files)
+        system_info = VOLATILE_SYSTEM_INFO.sub("", system_state.get("system_info", "")).strip()
+        
+        text = f"Files in current directory:\n{files_text}\n\nSystem information:\n{system_info}"
+        self.state_version = hashlib.md5(text.encode("utf-8")).hexdigest()[:8]
+        
+        return text
     
     def plan_tasks(self, goal: str) -> List[Dict]:
         """
@@ -228,60 +414,136 @@ class AIAgent:
         Returns:
             List of planned tasks
         """
+        # Reuse the plan of a sufficiently similar earlier goal, made by the
+        # same model under the same planning instructions
+        goal_embedding = None
+        plan_scope = hashlib.sha256(f"{self.model_id}\0{PLANNING_SYSTEM_PROMPT}".encode()).hexdigest()
+        
+        if self._plan_cache is not None:
+            goal_embedding = self._plan_cache.embed(goal)
+            cached = self._plan_cache.lookup(goal_embedding, plan_scope)
+            
+            if cached is not None:
+                logger.info("Reusing cached plan for a similar goal")
+                return copy.deepcopy(cached["tasks"])
+        
         # Analyze system state
         system_state = self.analyze_system_state()
         
-        # Create prompt for the AI model
-        prompt = f"""
-        GOAL: {goal}
+        # Create prompt for the AI model (only the per-call parts; the
+        # instructions are sent separately as the system prompt)
+        prompt = f"GOAL: {goal}\n\nCURRENT SYSTEM STATE:\n\n{self.render_system_state(system_state)}\n"
         
-        CURRENT SYSTEM STATE:
+        # Query the AI model for planning
+        response = self.query_model(prompt, PLANNING_SYSTEM_PROMPT)
         
-        Files in current directory:
-        {system_state.get('files', [])}
+        # Parse the response as JSON (it might be surrounded by text)
+        tasks = extract_json_array(response)
         
-        System information:
-        {system_state.get('system_info', '')}
+        if tasks is None:
+            logger.error("Failed to find JSON array in model response")
+            return []
         
-        Based on the goal and current system state, create a detailed plan with specific steps to achieve the goal.
-        Each step should be one of the following types: command, file_operation, or program_control.
+        if goal_embedding is not None and tasks:
+            self._plan_cache.add(goal, goal_embedding, {"tasks": copy.deepcopy(tasks)}, plan_scope)
         
-        Return the plan as a JSON array of tasks, where each task has the following structure:
-        {{
-            "type": "command | file_operation | program_control",
-            "description": "Description of the task",
-            "params": {{
-                // Parameters specific to the task type
-            }}
-        }}
+        return tasks
+    
+    def _run_task(self, task: Dict) -> bool:
+        """
+        Execute a single planned task.
         
-        ONLY RETURN THE JSON ARRAY WITHOUT ANY ADDITIONAL TEXT OR EXPLANATION.
+        Args:
+            task: Task to execute
+            
+        Returns:
+            True if the task was successful, False otherwise
         """
+        task_type = task.get("type")
+        params = task.get("params", {})
         
-        # Query the AI model for planning
-        response = self.query_model(prompt)
+        success = False
         
-        # Parse the response as JSON
-        try:
-            # Find JSON in the response (it might be surrounded by text)
-            json_start = response.find("[")
-            json_end = response.rfind("]") + 1
+        if task_type == "command":
+            command = params.get("command", "")
+            args = params.get("args", [])
             
-            if json_start >= 0 and json_end > json_start:
-                json_text = response[json_start:json_end]
-                tasks = json.loads(json_text)
-                return tasks
+            result = self.execute_command(command, args)
+            success = result.get("success", False)
+            
+            # Log command output (truncated, and only formatted if it will be emitted)
+            if success:
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("Command output: %s", result.get("stdout", "")[:MAX_LOGGED_OUTPUT])
+            elif logger.isEnabledFor(logging.ERROR):
+                logger.error("Command error: %s", result.get("stderr", "")[:MAX_LOGGED_OUTPUT])
+        
+        elif task_type == "file_operation":
+            operation = params.get("operation", "")
+            path = params.get("path", "")
+            content = params.get("content", "")
+            
+            if operation == "read":
+                content = self.read_file(path)
+                success = content != ""
+            elif operation == "write":
+                success = self.write_file(path, content)
+            elif operation == "delete":
+                result = self.client.delete_file(self.model_id, path)
+                success = result.get("success", False)
             else:
-                logger.error("Failed to find JSON array in model response")
-                return []
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON from model response: {str(e)}")
-            return []
+                logger.error("Unknown file operation: %s", operation)
+        
+        elif task_type == "program_control":
+            action = params.get("action", "")
+            
+            if action == "start":
+                program_path = params.get("program_path", "")
+                args = params.get("args", [])
+                
+                pid = self.start_program(program_path, args)
+                success = pid is not None
+                
+                # Store PID for later use
+                if success:
+                    params["pid"] = pid
+            
+            elif action == "stop":
+                pid = params.get("pid")
+                success = self.stop_program(pid)
+            
+            else:
+                logger.error("Unknown program action: %s", action)
+        
+        else:
+            logger.error("Unknown task type: %s", task_type)
+        
+        return success
+    
+    @staticmethod
+    def is_read_only(task: Dict) -> bool:
+        """Check whether a task has no side effects and may run concurrently"""
+        operation = task.get("params", {}).get("operation")
+        return (task.get("type"), operation) in TASK_READONLY
+    
+    async def _run_tasks_concurrently(self, tasks: List[Dict]) -> List[bool]:
+        """Run independent tasks in worker threads, bounded by max_concurrency"""
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def run_one(task: Dict) -> bool:
+            async with semaphore:
+                return await loop.run_in_executor(None, self._run_task, task)
+        
+        return await asyncio.gather(*(run_one(task) for task in tasks))
     
     def execute_tasks(self, tasks: List[Dict]) -> bool:
         """
         Execute a list of planned tasks.
         
+        Consecutive read-only tasks are executed concurrently; any other
+        task acts as a barrier and runs on its own, in plan order.
+        
         Args:
             tasks: List of tasks to execute
             
@@ -291,74 +553,33 @@ class AIAgent:
         self.tasks = tasks
         all_successful = True
         
-        for i, task in enumerate(tasks):
-            task_type = task.get("type")
-            description = task.get("description", "")
-            params = task.get("params", {})
-            
-            logger.info(f"Executing task {i+1}/{len(tasks)}: {description}")
-            
-            success = False
-            
-            if task_type == "command":
-                command = params.get("command", "")
-                args = params.get("args", [])
-                
-                result = self.execute_command(command, args)
-                success = result.get("success", False)
-                
-                # Log command output
-                if success:
-                    logger.info(f"Command output: {result.get('stdout', '')}")
-                else:
-                    logger.error(f"Command error: {result.get('stderr', '')}")
+        i = 0
+        
+        while i < len(tasks):
+            # Collect a run of consecutive read-only tasks (or a single other task)
+            batch_end = i
+            while batch_end < len(tasks) and self.is_read_only(tasks[batch_end]):
+                batch_end += 1
             
-            elif task_type == "file_operation":
-                operation = params.get("operation", "")
-                path = params.get("path", "")
-                content = params.get("content", "")
-                
-                if operation == "read":
-                    content = self.read_file(path)
-                    success = content != ""
-                elif operation == "write":
-                    success = self.write_file(path, content)
-                elif operation == "delete":
-                    result = self.client.delete_file(self.model_id, path)
-                    success = result.get("success", False)
-                else:
-                    logger.error(f"Unknown file operation: {operation}")
+            batch = tasks[i:max(batch_end, i + 1)]
             
-            elif task_type == "program_control":
-                action = params.get("action", "")
-                
-                if action == "start":
-                    program_path = params.get("program_path", "")
-                    args = params.get("args", [])
-                    
-                    pid = self.start_program(program_path, args)
-                    success = pid is not None
-                    
-                    # Store PID for later use
-                    if success:
-                        params["pid"] = pid
-                
-                elif action == "stop":
-                    pid = params.get("pid")
-                    success = self.stop_program(pid)
-                
-                else:
-                    logger.error(f"Unknown program action: {action}")
+            for offset, task in enumerate(batch):
+                logger.info("Executing task %d/%d: %s", i + offset + 1, len(tasks), task.get('description', ''))
             
+            if len(batch) > 1:
+                results = asyncio.run(self._run_tasks_concurrently(batch))
             else:
-                logger.error(f"Unknown task type: {task_type}")
+                results = [self._run_task(batch[0])]
             
-            # Update task status
-            task["success"] = success
+            for task, success in zip(batch, results):
+                # Update task status
+                task["success"] = success
+                
+                if not success:
+                    logger.error("Task failed: %s", task.get('description', ''))
+                    all_successful = False
             
-            if not success:
-                logger.error(f"Task failed: {description}")
-                all_successful = False
+            i += len(batch)
         
         return all_successful
     
@@ -372,7 +593,7 @@ class AIAgent:
         Returns:
             True if successful, False otherwise
         """
-        logger.info(f"Attempting to achieve goal: {goal}")
+        logger.info("Attempting to achieve goal: %s", goal)
         
         # Plan tasks
         tasks = self.plan_tasks(goal)
@@ -381,7 +602,7 @@ class AIAgent:
             logger.error("Failed to plan tasks")
             return False
         
-        logger.info(f"Planned {len(tasks)} tasks")
+        logger.info("Planned %d tasks", len(tasks))
         
         # Execute tasks
         return self.execute_tasks(tasks)
@@ -408,6 +629,6 @@ if __name__ == "__main__":
     success = agent.achieve_goal(goal)
     
     if success:
-        logger.info(f"Successfully achieved goal: {goal}")
+        logger.info("Successfully achieved goal: %s", goal)
     else:
-        logger.error(f"Failed to achieve goal: {goal}")
+        logger.error("Failed to achieve goal: %s", goal)
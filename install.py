@@ -13,6 +13,7 @@ import subprocess
 import logging
 import shutil
 import platform
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Configure logging
@@ -51,8 +52,22 @@ def install_dependencies():
     """Install required Python packages"""
     logger.info("Installing dependencies...")
     
+    env = {**os.environ, "PIP_NO_INPUT": "1"}
+    
+    # Prefer uv (much faster resolver/installer) when it is available
+    if shutil.which("uv"):
+        cmd = ["uv", "pip", "install", "--python", sys.executable, "-r", "requirements.txt"]
+    else:
+        cmd = [
+            sys.executable, "-m", "pip", "install",
+            "--prefer-binary",
+            "--no-compile",
+            "--disable-pip-version-check",
+            "-r", "requirements.txt"
+        ]
+    
     try:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"])
+        subprocess.check_call(cmd, env=env)
         logger.info("Dependencies installed successfully")
         return True
     except subprocess.CalledProcessError as e:
@@ -78,22 +93,33 @@ def copy_files(install_dir):
     logger.info("Copying files to installation directory...")
     
     try:
-        # Copy main files
-        for file in ["mcp_server.py", "mcp_client.py", "startup.py", "requirements.txt", ".env.example", "README.md"]:
-            if os.path.exists(file):
-                shutil.copy2(file, install_dir)
-                
-        # Copy models
-        if os.path.exists("models"):
-            for file in os.listdir("models"):
-                if file.endswith(".py"):
-                    shutil.copy2(os.path.join("models", file), os.path.join(install_dir, "models"))
-                    
-        # Copy examples
-        if os.path.exists("examples"):
-            for file in os.listdir("examples"):
-                if file.endswith(".py"):
-                    shutil.copy2(os.path.join("examples", file), os.path.join(install_dir, "examples"))
+        # Collect (source, destination) pairs
+        copies = []
+        
+        # Main files
+        for file in ["mcp_server.py", "command_runner.py", "mcp_client.py", "startup.py", "requirements.txt", ".env.example", "README.md"]:
+            copies.append((file, os.path.join(install_dir, file)))
+        
+        # Models and examples
+        for subdir in ["models", "examples"]:
+            if not os.path.isdir(subdir):
+                continue
+            
+            with os.scandir(subdir) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name.endswith(".py"):
+                        copies.append((entry.path, os.path.join(install_dir, subdir, entry.name)))
+        
+        # Copy in parallel; copyfile releases the GIL during the actual I/O
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(shutil.copyfile, src, dst) for src, dst in copies]
+        
+        for future in futures:
+            try:
+                future.result()
+            except FileNotFoundError:
+                # Optional files may be missing from the source tree
+                pass
         
         logger.info("Files copied successfully")
         return True
@@ -107,21 +133,30 @@ def create_env_file(install_dir):
     
     env_file = os.path.join(install_dir, ".env")
     
+    content = f"""# AI MCP Server Configuration
+# Created by install.py
+
+# Server configuration
+MCP_HOST=0.0.0.0
+MCP_PORT=8000
+MCP_API_KEY=your-secret-api-key
+
+# Default model configuration
+DEFAULT_MODEL={DEFAULT_MODEL}
+DEFAULT_MODEL_TYPE={DEFAULT_MODEL_TYPE}
+DEFAULT_MODEL_CONFIG={str(DEFAULT_MODEL_CONFIG)}
+
+# Ollama configuration (if used)
+OLLAMA_HOST=http://localhost:11434
+CONNECT_OLLAMA_MODELS=false
+"""
+    
     try:
-        with open(env_file, "w") as f:
-            f.write(f"# AI MCP Server Configuration\n")
-            f.write(f"# Created by install.py\n\n")
-            f.write(f"# Server configuration\n")
-            f.write(f"MCP_HOST=0.0.0.0\n")
-            f.write(f"MCP_PORT=8000\n")
-            f.write(f"MCP_API_KEY=your-secret-api-key\n\n")
-            f.write(f"# Default model configuration\n")
-            f.write(f"DEFAULT_MODEL={DEFAULT_MODEL}\n")
-            f.write(f"DEFAULT_MODEL_TYPE={DEFAULT_MODEL_TYPE}\n")
-            f.write(f"DEFAULT_MODEL_CONFIG={str(DEFAULT_MODEL_CONFIG)}\n\n")
-            f.write(f"# Ollama configuration (if used)\n")
-            f.write(f"OLLAMA_HOST=http://localhost:11434\n")
-            f.write(f"CONNECT_OLLAMA_MODELS=false\n")
+        # Write to a temporary file first so an interrupted install never
+        # leaves a half-written .env behind
+        tmp_file = env_file + ".tmp"
+        Path(tmp_file).write_text(content, encoding="utf-8")
+        os.replace(tmp_file, env_file)
         
         logger.info(f"Environment file created at {env_file}")
         return True
@@ -5,48 +5,253 @@ This library allows AI models to connect to the MCP server
 and perform various system operations.
 """
 
-import os
-import sys
-import json
 import time
+import asyncio
+import importlib.util
+import httpx
+import orjson
 import requests
-from typing import Dict, List, Any, Optional, Union
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Optional, Iterator, Tuple
+
+# How long each /task_wait long-poll asks the server to hold the request
+TASK_WAIT_TIMEOUT = 30
+
+# HTTP/2 support in httpx needs the optional h2 package (httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
 
 class MCPClient:
     """Client for interacting with the AI MCP Server"""
     
-    def __init__(self, server_url: str, api_key: str):
+    def __init__(self, server_url: str, api_key: str, timeout: Optional[float] = None):
         """
         Initialize the MCP client
         
         Args:
             server_url: URL of the MCP server (e.g., http://localhost:8000)
             api_key: API key for authentication
+            timeout: Seconds to wait for the server to answer a request (None
+                waits indefinitely). Task long-polls get this on top of the
+                time the server holds them.
         """
         self.server_url = server_url
         self.api_key = api_key
+        self.timeout = timeout
         self.headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
         
-    def _make_request(self, method: str, endpoint: str, data: Dict = None) -> Dict:
-        """Make an HTTP request to the MCP server"""
+        # Shared session so sequential requests (e.g. status polls) reuse
+        # keep-alive connections instead of reconnecting each time
+        self._session = requests.Session()
+        self._session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        
+        # Async client for the a* methods, created lazily on first use
+        self._async_client: Optional[httpx.AsyncClient] = None
+        
+        # Whether the server has /connect_models; False once it returns 404
+        self._batch_connect_supported = True
+        
+    def _request_timeout(self, hold: float) -> Optional[float]:
+        """Client-side timeout for a request the server may hold for hold seconds"""
+        return None if self.timeout is None else self.timeout + hold
+    
+    def _make_request(self, method: str, endpoint: str, data: Dict = None, hold: float = 0) -> Dict:
+        """Make an HTTP request to the MCP server (hold: seconds a long-poll may be held)"""
         url = f"{self.server_url}/{endpoint}"
+        timeout = self._request_timeout(hold)
         
         try:
             if method.lower() == "get":
-                response = requests.get(url, headers=self.headers)
+                response = self._session.get(url, timeout=timeout)
             elif method.lower() == "post":
-                response = requests.post(url, headers=self.headers, json=data)
+                # Encode with orjson; the session already sends the JSON Content-Type
+                body = orjson.dumps(data) if data is not None else None
+                response = self._session.post(url, data=body, timeout=timeout)
             else:
                 return {"success": False, "error": f"Unsupported HTTP method: {method}"}
                 
             response.raise_for_status()
-            return response.json()
+            return orjson.loads(response.content)
             
-        except requests.exceptions.RequestException as e:
+        except requests.exceptions.HTTPError as e:
+            return {"success": False, "error": f"Request error: {str(e)}", "status_code": e.response.status_code}
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
             return {"success": False, "error": f"Request error: {str(e)}"}
+    
+    def close(self):
+        """Close the HTTP session and its pooled connections"""
+        self._session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    def _wait_for_task(self, task_id: str) -> Dict:
+        """
+        Wait for a task to complete or fail
+        
+        Uses the server's /task_wait long-poll, which returns as soon as the
+        task finishes, so each task costs about one round-trip instead of
+        repeated status checks.
+        
+        Args:
+            task_id: ID of the task to wait for
+            
+        Returns:
+            Dict with the task result
+        """
+        while True:
+            status = self._make_request("get", f"task_wait/{task_id}?timeout={TASK_WAIT_TIMEOUT}", hold=TASK_WAIT_TIMEOUT)
+            
+            if status.get("status") in ["completed", "failed"]:
+                return status.get("result") or {"success": False, "error": status.get("error")}
+            
+            if "status" not in status:
+                # Request error while waiting
+                return status
+    
+    def _submit_and_wait(self, model_id: str, task_type: str, data: Dict) -> Dict:
+        """
+        Submit a task to the server and wait for its result
+        
+        Args:
+            model_id: ID of the requesting model
+            task_type: Type of task (system_command, file_operation, ...)
+            data: Task-specific data
+            
+        Returns:
+            Dict with the task result, or the error from submitting it
+        """
+        response = self._submit_task(model_id, task_type, data)
+        
+        task_id = response.get("task_id")
+        
+        if not task_id:
+            return response
+            
+        # Wait for task completion
+        return self._wait_for_task(task_id)
+    
+    def _submit_task(self, model_id: str, task_type: str, data: Dict) -> Dict:
+        """Submit a task to the server without waiting for it"""
+        request = {
+            "model_id": model_id,
+            "task_type": task_type,
+            "data": data
+        }
+        
+        return self._make_request("post", "execute_task", request)
+    
+    def _wait_for_many(self, task_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Wait for several tasks at once
+        
+        Each round-trip long-polls /task_status_batch for all still-pending
+        tasks, instead of one request per task.
+        
+        Args:
+            task_ids: IDs of the tasks to wait for
+            
+        Returns:
+            Dict mapping each task ID to its result
+        """
+        results = {}
+        pending = list(dict.fromkeys(task_ids))
+        
+        while pending:
+            statuses = self._make_request("post", f"task_status_batch?wait={TASK_WAIT_TIMEOUT}", pending, hold=TASK_WAIT_TIMEOUT)
+            
+            if statuses.get("success") is False:
+                # Request error while waiting
+                for task_id in pending:
+                    results[task_id] = statuses
+                break
+            
+            for task_id in pending:
+                status = statuses.get(task_id)
+                
+                if status is None:
+                    results[task_id] = {"success": False, "error": f"Task {task_id} not found"}
+                elif status.get("status") in ["completed", "failed"]:
+                    results[task_id] = status.get("result") or {"success": False, "error": status.get("error")}
+            
+            pending = [task_id for task_id in pending if task_id not in results]
+        
+        return results
+    
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Get the async HTTP client, creating it on first use"""
+        if self._async_client is None:
+            # HTTP/2 is only negotiated over TLS (ALPN), e.g. when the server
+            # sits behind an HTTPS proxy; it multiplexes concurrent calls over
+            # one connection
+            self._async_client = httpx.AsyncClient(
+                base_url=self.server_url,
+                headers=self.headers,
+                timeout=None,
+                http2=HTTP2_AVAILABLE and self.server_url.startswith("https://")
+            )
+        return self._async_client
+    
+    async def _make_request_async(self, method: str, endpoint: str, data: Dict = None, hold: float = 0) -> Dict:
+        """Make an HTTP request to the MCP server without blocking the event loop"""
+        client = self._get_async_client()
+        timeout = self._request_timeout(hold)
+        
+        try:
+            if method.lower() == "get":
+                response = await client.get(f"/{endpoint}", timeout=timeout)
+            elif method.lower() == "post":
+                body = orjson.dumps(data) if data is not None else None
+                response = await client.post(f"/{endpoint}", content=body, timeout=timeout)
+            else:
+                return {"success": False, "error": f"Unsupported HTTP method: {method}"}
+                
+            response.raise_for_status()
+            return orjson.loads(response.content)
+            
+        except httpx.HTTPStatusError as e:
+            return {"success": False, "error": f"Request error: {str(e)}", "status_code": e.response.status_code}
+        except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+            return {"success": False, "error": f"Request error: {str(e)}"}
+    
+    async def _asubmit_and_wait(self, model_id: str, task_type: str, data: Dict) -> Dict:
+        """Async version of _submit_and_wait, waiting without blocking the event loop"""
+        request = {
+            "model_id": model_id,
+            "task_type": task_type,
+            "data": data
+        }
+        
+        response = await self._make_request_async("post", "execute_task", request)
+        
+        task_id = response.get("task_id")
+        
+        if not task_id:
+            return response
+        
+        while True:
+            status = await self._make_request_async("get", f"task_wait/{task_id}?timeout={TASK_WAIT_TIMEOUT}", hold=TASK_WAIT_TIMEOUT)
+            
+            if status.get("status") in ["completed", "failed"]:
+                return status.get("result") or {"success": False, "error": status.get("error")}
+            
+            if "status" not in status:
+                # Request error while waiting
+                return status
+    
+    async def aclose(self):
+        """Close the async HTTP client, if one was created"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
             
     def connect_model(self, model_id: str, model_type: str, config: Dict = None) -> Dict:
         """
@@ -71,6 +276,48 @@ class MCPClient:
         
         return self._make_request("post", "connect_model", data)
         
+    def connect_models(self, model_ids: List[str], model_type: str, config: Dict = None) -> Dict:
+        """
+        Connect to several AI models of one type in a single request
+        
+        Falls back to one connect_model call per model on servers without
+        the /connect_models endpoint.
+        
+        Args:
+            model_ids: IDs of the models (e.g., ["llama2", "mistral"])
+            model_type: Type of the models (e.g., ollama)
+            config: Configuration shared by the models
+            
+        Returns:
+            Dict with a per-model list of results
+        """
+        if config is None:
+            config = {}
+        
+        if self._batch_connect_supported:
+            data = {
+                "model_ids": model_ids,
+                "model_type": model_type,
+                "config": config
+            }
+            
+            response = self._make_request("post", "connect_models", data)
+            if response.get("status_code") != 404:
+                return response
+            
+            self._batch_connect_supported = False
+        
+        results = [self.connect_model(model_id, model_type, config) for model_id in model_ids]
+        return {"success": True, "results": self._connect_results(model_ids, results)}
+    
+    @staticmethod
+    def _connect_results(model_ids: List[str], results: List[Dict]) -> List[Dict]:
+        """Shape per-model connect_model results like the /connect_models response"""
+        return [
+            {"model_id": model_id, "success": result.get("success", False), "error": result.get("error")}
+            for model_id, result in zip(model_ids, results)
+        ]
+        
     def disconnect_model(self, model_id: str) -> Dict:
         """
         Disconnect from an AI model
@@ -111,31 +358,13 @@ class MCPClient:
             args = []
             
         data = {
-            "model_id": model_id,
-            "task_type": "system_command",
-            "data": {
-                "command": command,
-                "args": args,
-                "working_dir": working_dir,
-                "timeout": timeout
-            }
+            "command": command,
+            "args": args,
+            "working_dir": working_dir,
+            "timeout": timeout
         }
         
-        response = self._make_request("post", "execute_task", data)
-        
-        if not response.get("success", False):
-            return response
-            
-        # Wait for task completion
-        task_id = response.get("task_id")
-        
-        while True:
-            status = self._make_request("get", f"task_status/{task_id}")
-            
-            if status.get("status") in ["completed", "failed"]:
-                return status.get("result", {"success": False, "error": status.get("error")})
-                
-            time.sleep(0.5)
+        return self._submit_and_wait(model_id, "system_command", data)
             
     def execute_file_operation(self, model_id: str, operation: str, path: str, 
                                content: str = None) -> Dict:
@@ -152,30 +381,12 @@ class MCPClient:
             Dict with file operation result
         """
         data = {
-            "model_id": model_id,
-            "task_type": "file_operation",
-            "data": {
-                "operation": operation,
-                "path": path,
-                "content": content
-            }
+            "operation": operation,
+            "path": path,
+            "content": content
         }
         
-        response = self._make_request("post", "execute_task", data)
-        
-        if not response.get("success", False):
-            return response
-            
-        # Wait for task completion
-        task_id = response.get("task_id")
-        
-        while True:
-            status = self._make_request("get", f"task_status/{task_id}")
-            
-            if status.get("status") in ["completed", "failed"]:
-                return status.get("result", {"success": False, "error": status.get("error")})
-                
-            time.sleep(0.5)
+        return self._submit_and_wait(model_id, "file_operation", data)
             
     def control_program(self, model_id: str, action: str, program_path: str = None, 
                        args: List[str] = None, pid: int = None) -> Dict:
@@ -196,36 +407,18 @@ class MCPClient:
             args = []
             
         data = {
-            "model_id": model_id,
-            "task_type": "program_control",
-            "data": {
-                "action": action
-            }
+            "action": action
         }
         
         if action == "start":
-            data["data"]["program_path"] = program_path
-            data["data"]["args"] = args
+            data["program_path"] = program_path
+            data["args"] = args
         elif action == "stop":
-            data["data"]["pid"] = pid
+            data["pid"] = pid
             
-        response = self._make_request("post", "execute_task", data)
-        
-        if not response.get("success", False):
-            return response
-            
-        # Wait for task completion
-        task_id = response.get("task_id")
-        
-        while True:
-            status = self._make_request("get", f"task_status/{task_id}")
-            
-            if status.get("status") in ["completed", "failed"]:
-                return status.get("result", {"success": False, "error": status.get("error")})
-                
-            time.sleep(0.5)
+        return self._submit_and_wait(model_id, "program_control", data)
             
-    def query_model(self, model_id: str, target_model: str, prompt: str) -> Dict:
+    def query_model(self, model_id: str, target_model: str, prompt: str, system_prompt: str = None) -> Dict:
         """
         Query an AI model
         
@@ -233,34 +426,125 @@ class MCPClient:
             model_id: ID of the requesting model
             target_model: ID of the model to query
             prompt: Prompt to send to the model
+            system_prompt: Optional static instructions sent ahead of the prompt
             
         Returns:
             Dict with model query result
         """
         data = {
-            "model_id": model_id,
-            "task_type": "model_query",
-            "data": {
-                "target_model": target_model,
-                "prompt": prompt
-            }
+            "target_model": target_model,
+            "prompt": prompt
         }
         
-        response = self._make_request("post", "execute_task", data)
+        if system_prompt:
+            data["system_prompt"] = system_prompt
         
-        if not response.get("success", False):
-            return response
+        return self._submit_and_wait(model_id, "model_query", data)
             
-        # Wait for task completion
-        task_id = response.get("task_id")
+    def execute_tasks(self, model_id: str, task_list: List[Tuple[str, Dict]]) -> List[Dict]:
+        """
+        Submit several tasks up front and wait for all of them together
         
-        while True:
-            status = self._make_request("get", f"task_status/{task_id}")
+        Args:
+            model_id: ID of the requesting model
+            task_list: (task_type, data) pairs, e.g. ("file_operation", {"operation": "read", "path": "a.txt"})
             
-            if status.get("status") in ["completed", "failed"]:
-                return status.get("result", {"success": False, "error": status.get("error")})
-                
-            time.sleep(0.5)
+        Returns:
+            List of task results, in the same order as task_list
+        """
+        responses = [self._submit_task(model_id, task_type, data) for task_type, data in task_list]
+        
+        results = self._wait_for_many([r["task_id"] for r in responses if r.get("task_id")])
+        
+        return [results[r["task_id"]] if r.get("task_id") else r for r in responses]
+    
+    # Async variants (do not block the calling thread while a task runs)
+    
+    async def aconnect_model(self, model_id: str, model_type: str, config: Dict = None) -> Dict:
+        """Async version of connect_model"""
+        data = {
+            "model_id": model_id,
+            "model_type": model_type,
+            "config": config or {}
+        }
+        
+        return await self._make_request_async("post", "connect_model", data)
+    
+    async def aconnect_models(self, model_ids: List[str], model_type: str, config: Dict = None) -> Dict:
+        """Async version of connect_models; the fallback connects run concurrently"""
+        if self._batch_connect_supported:
+            data = {
+                "model_ids": model_ids,
+                "model_type": model_type,
+                "config": config or {}
+            }
+            
+            response = await self._make_request_async("post", "connect_models", data)
+            if response.get("status_code") != 404:
+                return response
+            
+            self._batch_connect_supported = False
+        
+        results = await asyncio.gather(*(self.aconnect_model(model_id, model_type, config) for model_id in model_ids))
+        return {"success": True, "results": self._connect_results(model_ids, results)}
+    
+    async def adisconnect_model(self, model_id: str) -> Dict:
+        """Async version of disconnect_model"""
+        return await self._make_request_async("post", f"disconnect_model/{model_id}")
+    
+    async def alist_models(self) -> Dict:
+        """Async version of list_models"""
+        return await self._make_request_async("get", "list_models")
+    
+    async def aexecute_system_command(self, model_id: str, command: str, args: List[str] = None,
+                                      working_dir: str = None, timeout: int = 60) -> Dict:
+        """Async version of execute_system_command"""
+        data = {
+            "command": command,
+            "args": args or [],
+            "working_dir": working_dir,
+            "timeout": timeout
+        }
+        
+        return await self._asubmit_and_wait(model_id, "system_command", data)
+    
+    async def aexecute_file_operation(self, model_id: str, operation: str, path: str,
+                                      content: str = None) -> Dict:
+        """Async version of execute_file_operation"""
+        data = {
+            "operation": operation,
+            "path": path,
+            "content": content
+        }
+        
+        return await self._asubmit_and_wait(model_id, "file_operation", data)
+    
+    async def acontrol_program(self, model_id: str, action: str, program_path: str = None,
+                               args: List[str] = None, pid: int = None) -> Dict:
+        """Async version of control_program"""
+        data = {
+            "action": action
+        }
+        
+        if action == "start":
+            data["program_path"] = program_path
+            data["args"] = args or []
+        elif action == "stop":
+            data["pid"] = pid
+        
+        return await self._asubmit_and_wait(model_id, "program_control", data)
+    
+    async def aquery_model(self, model_id: str, target_model: str, prompt: str, system_prompt: str = None) -> Dict:
+        """Async version of query_model"""
+        data = {
+            "target_model": target_model,
+            "prompt": prompt
+        }
+        
+        if system_prompt:
+            data["system_prompt"] = system_prompt
+        
+        return await self._asubmit_and_wait(model_id, "model_query", data)
             
     # Convenience methods for file operations
     
@@ -276,9 +560,95 @@ class MCPClient:
         """Delete a file or directory"""
         return self.execute_file_operation(model_id, "delete", path)
         
-    def list_directory(self, model_id: str, path: str) -> Dict:
-        """List directory contents"""
-        return self.execute_file_operation(model_id, "list", path)
+    def list_directory(self, model_id: str, path: str, max_depth: int = None,
+                       max_entries: int = None) -> Dict:
+        """List directory contents, optionally overriding the server's depth and size limits"""
+        data = {
+            "operation": "list",
+            "path": path
+        }
+        
+        if max_depth is not None:
+            data["max_depth"] = max_depth
+        if max_entries is not None:
+            data["max_entries"] = max_entries
+        
+        return self._submit_and_wait(model_id, "file_operation", data)
+        
+    def iter_file(self, path: str, offset: int = 0, length: int = None,
+                  chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """
+        Stream a file's raw bytes from the server
+        
+        Unlike read_file, the content is never held in memory as a whole or
+        encoded as JSON, which makes this suitable for large or binary files.
+        
+        Args:
+            path: Path of the file on the server
+            offset: Byte offset to start reading from
+            length: Maximum number of bytes to read (default: to end of file)
+            chunk_size: Size of the chunks to yield
+            
+        Returns:
+            Iterator over the file's bytes
+        """
+        params = {"path": path, "offset": offset}
+        if length is not None:
+            params["length"] = length
+        
+        with self._session.get(f"{self.server_url}/file_stream", params=params, stream=True) as response:
+            response.raise_for_status()
+            yield from response.iter_content(chunk_size=chunk_size)
+            
+    def iter_directory(self, path: str, max_depth: int = 3, max_entries: int = None) -> Iterator[str]:
+        """
+        Stream a directory listing from the server
+        
+        Entries arrive while the server is still walking the tree, so large
+        listings can be consumed without waiting for (or holding) all of them.
+        
+        Args:
+            path: Directory path on the server
+            max_depth: How many directory levels to descend
+            max_entries: Maximum number of entries to return (default: no limit)
+            
+        Returns:
+            Iterator over paths relative to the directory
+        """
+        params = {"path": path, "max_depth": max_depth}
+        if max_entries is not None:
+            params["max_entries"] = max_entries
+        
+        with self._session.get(f"{self.server_url}/list_stream", params=params, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield orjson.loads(line)
+            
+    def download_file(self, path: str, destination: str) -> Dict:
+        """Download a file from the server to a local destination"""
+        try:
+            with open(destination, "wb") as f:
+                for chunk in self.iter_file(path):
+                    f.write(chunk)
+            return {"success": True, "path": destination}
+        except (requests.exceptions.RequestException, OSError) as e:
+            return {"success": False, "error": f"Download error: {str(e)}"}
+            
+    def upload_file(self, source: str, path: str) -> Dict:
+        """Upload a local file to the server, streaming it rather than sending its content as JSON"""
+        try:
+            with open(source, "rb") as f:
+                response = self._session.put(
+                    f"{self.server_url}/file_upload",
+                    params={"path": path},
+                    data=f,
+                    headers={"Content-Type": "application/octet-stream"}
+                )
+            response.raise_for_status()
+            return orjson.loads(response.content)
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError, OSError) as e:
+            return {"success": False, "error": f"Upload error: {str(e)}"}
         
     # Convenience methods for program control
     
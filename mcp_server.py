@@ -7,20 +7,36 @@ enabling file operations, program control, and various system tasks.
 
 import os
 import sys
-import json
+import asyncio
+import atexit
+import hashlib
+import hmac
+import itertools
+import multiprocessing
+import queue
+import shutil
 import subprocess
 import logging
 import signal
-import threading
 import time
+import uuid
+import httpx
+import orjson
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, List, Any, Optional, Set, Tuple
 
-from fastapi import FastAPI, HTTPException, Depends, Request, BackgroundTasks, Header
+from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel, Field
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+from command_runner import run_command_blocking
 
 # Import model connectors dynamically
 try:
@@ -44,6 +60,8 @@ class FileOperation(BaseModel):
     operation: str  # read, write, delete, list
     path: str
     content: Optional[str] = None
+    max_depth: int = 3  # list only
+    max_entries: int = 10000  # list only
     
 class TaskRequest(BaseModel):
     """Model for AI task requests"""
@@ -64,9 +82,87 @@ class ModelConnectRequest(BaseModel):
     model_type: str  # ollama, claude, openai, etc.
     config: Dict[str, Any] = {}
 
+class ModelsConnectRequest(BaseModel):
+    """Model for connecting several models of one type with a shared config"""
+    model_ids: List[str]
+    model_type: str
+    config: Dict[str, Any] = {}
+
+@dataclass
+class TaskRecord:
+    """Server-side state of a submitted task"""
+    model_id: str
+    task_type: str
+    data: Dict[str, Any]
+    status: str = "processing"
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+    
+    def to_response(self, task_id: str) -> TaskResponse:
+        return TaskResponse(task_id=task_id, status=self.status, result=self.result, error=self.error)
+
 # --- Core Server ---
 
-app = FastAPI(title="AI Master Control Program")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared resources on startup and release them on shutdown"""
+    # Shared async HTTP client for model backend calls. No read timeout:
+    # model inference can legitimately take minutes. Keep-alive pool sized
+    # for many concurrent queries; the transport retries failed connection
+    # attempts (never requests already sent)
+    app.state.http = httpx.AsyncClient(
+        timeout=httpx.Timeout(None, connect=10.0),
+        limits=httpx.Limits(max_keepalive_connections=10, max_connections=100),
+        transport=httpx.AsyncHTTPTransport(retries=2)
+    )
+    
+    # Limit on concurrently spawning/running subprocesses
+    app.state.subprocess_slots = asyncio.Semaphore(MAX_SUBPROCESSES)
+    
+    # Pre-spawned command helpers, forked from a fresh forkserver process
+    # (preloaded with command_runner only) rather than from this one.
+    # multiprocessing still imports this script in each helper as
+    # __mp_main__; IS_POOL_HELPER keeps its process-wide setup out of them
+    app.state.spawn_pool = None
+    if SPAWN_POOL_SIZE > 0:
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        mp_context = multiprocessing.get_context(start_method)
+        if start_method == "forkserver":
+            mp_context.set_forkserver_preload(["command_runner"])
+        
+        app.state.spawn_pool = ProcessPoolExecutor(max_workers=SPAWN_POOL_SIZE, mp_context=mp_context)
+        
+        # Start the helpers now instead of on the first command
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(app.state.spawn_pool, os.getpid) for _ in range(SPAWN_POOL_SIZE)))
+    
+    # Bounded task queue drained by a fixed pool of workers
+    app.state.task_queue = asyncio.Queue(maxsize=TASK_QUEUE_SIZE)
+    app.state.worker_tasks = [None] * TASK_WORKERS  # task_id each worker is running
+    workers = [asyncio.create_task(task_worker(i)) for i in range(TASK_WORKERS)]
+    
+    try:
+        yield
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        
+        await stop_all_programs()
+        
+        # Close model connector clients and the shared client
+        for model_info in connected_models.values():
+            if "connector" in model_info:
+                await model_info["connector"].aclose()
+        
+        await app.state.http.aclose()
+        
+        if app.state.spawn_pool is not None:
+            app.state.spawn_pool.shutdown(wait=False)
+
+# orjson renders large payloads (file contents, listings, model output) much faster
+app = FastAPI(title="AI Master Control Program", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -79,34 +175,103 @@ app.add_middleware(
 
 # Security setup - use environment variable in production
 API_KEY = os.getenv("MCP_API_KEY", "your-secret-api-key")
-security = HTTPBearer()
+API_KEY_DIGEST = hashlib.sha256(API_KEY.encode()).digest()
+
+# True when multiprocessing re-imports this script in a child process (spawn
+# pool helpers, uvicorn worker processes); such copies skip the log
+# listener and signal handlers, which the importing process sets up itself
+IS_POOL_HELPER = __name__ == "__mp_main__"
 
 # Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
+# Request handlers only enqueue records; a listener thread does the file
+# and console writes, so slow I/O never blocks the event loop
+if not IS_POOL_HELPER:
+    log_queue = queue.SimpleQueue()
+    log_formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
+    log_handlers = [
         logging.FileHandler("mcp_server.log"),
         logging.StreamHandler(sys.stdout)
     ]
-)
+    for log_handler in log_handlers:
+        log_handler.setFormatter(log_formatter)
+    
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(QueueHandler(log_queue))
+    log_listener = QueueListener(log_queue, *log_handlers, respect_handler_level=True)
+    log_listener.start()
+    
+    # Flush queued records on interpreter exit
+    atexit.register(log_listener.stop)
+
 logger = logging.getLogger("mcp_server")
 
+# Uploads are buffered up to this size before each disk write
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Files at least this large are read/written with page-cache hints
+BULK_IO_THRESHOLD = 16 << 20
+
+# Upper bound for a single /task_wait long-poll, in seconds
+MAX_TASK_WAIT = 60.0
+
+# Idempotent tasks; identical concurrent submissions of these share one run
+COALESCED_FILE_OPERATIONS = {"read", "list"}
+
+# File operations that change what later reads/listings of a path return
+MUTATING_FILE_OPERATIONS = {"write", "delete"}
+COALESCED_TASK_TYPES = {"model_query"}
+
+# Task execution pool. Tasks are mostly I/O-bound (subprocesses, model
+# queries), so the default runs several workers per CPU
+TASK_WORKERS = int(os.getenv("MCP_TASK_WORKERS", str(4 * (os.cpu_count() or 1))))
+TASK_QUEUE_SIZE = int(os.getenv("MCP_TASK_QUEUE_SIZE", "1000"))
+
+# Maximum number of commands running (or programs being started) at once
+MAX_SUBPROCESSES = int(os.getenv("MCP_MAX_SUBPROC", "16"))
+
+# Optional pool of pre-spawned helper processes that run system commands, so
+# short commands fork a small helper rather than the whole server (0 = off)
+SPAWN_POOL_SIZE = int(os.getenv("MCP_SPAWN_POOL_SIZE", "0"))
+
+# Maximum number of task records kept; the least recently used are dropped
+MAX_TASKS = 10000
+
+# How long a fetched Ollama model list is reused, in seconds
+OLLAMA_TAGS_TTL = 30.0
+
 # Task tracking
-tasks = {}
+# Only touched from the event loop thread, so no locking is needed
+tasks: "OrderedDict[str, TaskRecord]" = OrderedDict()
 connected_models = {}
 running_processes = {}
+ollama_tags_cache: Dict[str, Tuple[float, Set[str]]] = {}
+ollama_tags_fetches: Dict[str, "asyncio.Future[Set[str]]"] = {}  # host -> in-flight fetch
+inflight_tasks: Dict[str, str] = {}  # coalescing key -> task_id
+inflight_file_paths: Dict[str, str] = {}  # coalescing key -> absolute path of a read/list
+subprocess_stats = {"acquired": 0, "wait_seconds": 0.0}
 
 # --- Authentication & Security ---
 
-def verify_api_key(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    if credentials.credentials != API_KEY:
+def verify_api_key(request: Request):
+    # Parse the Bearer header directly; this runs on every request
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    
+    if scheme.lower() != "bearer" or not token:
+        # Same response HTTPBearer gives for a missing/malformed header
+        raise HTTPException(status_code=403, detail="Not authenticated")
+    
+    # Compare fixed-length digests in constant time so neither the key's
+    # contents nor its length leak through response timing
+    provided_digest = hashlib.sha256(token.encode()).digest()
+    
+    if not hmac.compare_digest(provided_digest, API_KEY_DIGEST):
         raise HTTPException(
             status_code=401,
             detail="Invalid API Key",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return credentials.credentials
+    return token
 
 # --- File Operations ---
 
@@ -117,8 +282,7 @@ def execute_file_operation(operation: FileOperation) -> Dict[str, Any]:
         if operation.operation == "read":
             if not path.exists():
                 return {"success": False, "error": "File not found"}
-            with open(path, "r") as f:
-                content = f.read()
+            content = read_file_text(path)
             return {"success": True, "content": content}
             
         elif operation.operation == "write":
@@ -126,11 +290,9 @@ def execute_file_operation(operation: FileOperation) -> Dict[str, Any]:
                 return {"success": False, "error": "No content provided"}
             
             # Create directories if they don't exist
-            if not path.parent.exists():
-                path.parent.mkdir(parents=True)
+            path.parent.mkdir(parents=True, exist_ok=True)
                 
-            with open(path, "w") as f:
-                f.write(operation.content)
+            write_file_bytes(path, operation.content.encode("utf-8"))
             return {"success": True}
             
         elif operation.operation == "delete":
@@ -138,7 +300,6 @@ def execute_file_operation(operation: FileOperation) -> Dict[str, Any]:
                 return {"success": False, "error": "File not found"}
             
             if path.is_dir():
-                import shutil
                 shutil.rmtree(path)
             else:
                 path.unlink()
@@ -148,8 +309,11 @@ def execute_file_operation(operation: FileOperation) -> Dict[str, Any]:
             if not path.exists() or not path.is_dir():
                 return {"success": False, "error": "Directory not found"}
             
-            files = [str(f.relative_to(path)) for f in path.glob("**/*")]
-            return {"success": True, "files": files}
+            entries = iter_directory(str(path), operation.max_depth)
+            files = list(itertools.islice(entries, operation.max_entries + 1))
+            truncated = len(files) > operation.max_entries
+            
+            return {"success": True, "files": files[:operation.max_entries], "truncated": truncated}
             
         else:
             return {"success": False, "error": f"Unknown operation: {operation.operation}"}
@@ -158,83 +322,196 @@ def execute_file_operation(operation: FileOperation) -> Dict[str, Any]:
         logger.error(f"File operation error: {str(e)}")
         return {"success": False, "error": str(e)}
 
+def read_file_text(path: Path) -> str:
+    """Read a UTF-8 text file, using a single unbuffered read for large files"""
+    # UTF-8 on both paths, matching what the write operation produces
+    if path.stat().st_size < BULK_IO_THRESHOLD:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    
+    # Same decoding and newline handling as text mode, without copying the
+    # data through the buffered reader and incremental decoder
+    text = read_file_bytes(path).decode("utf-8")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+def read_file_bytes(path: Path) -> bytearray:
+    """Read a whole file into a preallocated buffer with raw reads"""
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    
+    try:
+        # The file is read once, front to back
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        
+        data = bytearray(os.fstat(fd).st_size)
+        offset = 0
+        with open(fd, "rb", buffering=0, closefd=False) as f, memoryview(data) as view:
+            while offset < len(data):
+                count = f.readinto(view[offset:])
+                if not count:
+                    break  # File shrank while reading
+                offset += count
+        
+        if offset < len(data):
+            del data[offset:]
+        return data
+    finally:
+        os.close(fd)
+
+def write_file_bytes(path: Path, data: bytes):
+    """Write bytes to a file with raw os.write calls, bypassing the buffered text layer"""
+    # 0o666 masked by the umask, the same permissions open() would use
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o666)
+    
+    try:
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+        
+        # Large payloads are rarely read back soon; start writeback and
+        # let the kernel drop them from the page cache
+        if len(data) >= BULK_IO_THRESHOLD and hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+def iter_directory(root: str, max_depth: int = 3):
+    """Yield paths under root (relative to it), descending at most max_depth levels"""
+    prefix_len = len(os.path.join(root, ""))
+    stack = [(root, 1)]
+    
+    while stack:
+        current, depth = stack.pop()
+        
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    yield entry.path[prefix_len:]
+                    
+                    if depth < max_depth and entry.is_dir(follow_symlinks=False):
+                        stack.append((entry.path, depth + 1))
+        except OSError:
+            # Unreadable directory; skip it rather than failing the whole listing
+            continue
+
+def iter_file(path: Path, offset: int = 0, length: Optional[int] = None, chunk_size: int = 64 * 1024):
+    """Yield a file's raw bytes in fixed-size chunks, optionally limited to a byte range"""
+    remaining = length
+    
+    with open(path, "rb") as f:
+        f.seek(offset)
+        
+        while remaining is None or remaining > 0:
+            chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
 # --- System Command Execution ---
 
-def execute_system_command(command_request: SystemCommand) -> Dict[str, Any]:
+@asynccontextmanager
+async def subprocess_slot():
+    """Hold one of the MCP_MAX_SUBPROC subprocess slots, recording how long it took to get"""
+    started = time.monotonic()
+    
+    async with app.state.subprocess_slots:
+        subprocess_stats["acquired"] += 1
+        subprocess_stats["wait_seconds"] += time.monotonic() - started
+        yield
+
+async def execute_system_command(command_request: SystemCommand) -> Dict[str, Any]:
     cmd = [command_request.command] + command_request.args
     cwd = command_request.working_dir
     timeout = command_request.timeout
 
-    try:
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            cwd=cwd,
-            text=True,
-            shell=False  # More secure, but requires full paths
-        )
+    async with subprocess_slot():
+        if app.state.spawn_pool is not None:
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(app.state.spawn_pool, run_command_blocking, cmd, cwd, timeout)
+            except Exception as e:
+                # e.g. a helper died (BrokenProcessPool). Don't retry: the
+                # command may already have run
+                logger.error(f"Spawn pool error: {str(e)}")
+                return {"success": False, "error": f"Spawn pool error: {str(e)}"}
         
         try:
-            stdout, stderr = process.communicate(timeout=timeout)
-            return {
-                "success": True if process.returncode == 0 else False,
-                "returncode": process.returncode,
-                "stdout": stdout,
-                "stderr": stderr
-            }
-        except subprocess.TimeoutExpired:
-            process.kill()
-            return {
-                "success": False,
-                "error": f"Command timed out after {timeout} seconds"
-            }
+            # exec (no shell) is more secure, but requires full paths
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                cwd=cwd
+            )
             
-    except Exception as e:
-        logger.error(f"Command execution error: {str(e)}")
-        return {"success": False, "error": str(e)}
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+                return {
+                    "success": True if process.returncode == 0 else False,
+                    "returncode": process.returncode,
+                    "stdout": stdout.decode(errors="replace"),
+                    "stderr": stderr.decode(errors="replace")
+                }
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                return {
+                    "success": False,
+                    "error": f"Command timed out after {timeout} seconds"
+                }
+                
+        except Exception as e:
+            logger.error(f"Command execution error: {str(e)}")
+            return {"success": False, "error": str(e)}
 
 # --- Program Control ---
 
-def start_program(program_path: str, args: List[str] = None) -> Dict[str, Any]:
+async def start_program(program_path: str, args: List[str] = None) -> Dict[str, Any]:
     if args is None:
         args = []
         
     cmd = [program_path] + args
     
-    try:
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        
-        pid = process.pid
-        running_processes[pid] = process
-        
-        return {
-            "success": True,
-            "pid": pid,
-            "message": f"Program started with PID {pid}"
-        }
-        
-    except Exception as e:
-        logger.error(f"Program start error: {str(e)}")
-        return {"success": False, "error": str(e)}
+    async with subprocess_slot():
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE
+            )
+            
+            pid = process.pid
+            running_processes[pid] = process
+            
+            return {
+                "success": True,
+                "pid": pid,
+                "message": f"Program started with PID {pid}"
+            }
+            
+        except Exception as e:
+            logger.error(f"Program start error: {str(e)}")
+            return {"success": False, "error": str(e)}
 
-def stop_program(pid: int) -> Dict[str, Any]:
+async def stop_program(pid: int) -> Dict[str, Any]:
     if pid not in running_processes:
         return {"success": False, "error": f"No program with PID {pid} is being tracked"}
         
     process = running_processes[pid]
     
     try:
-        process.terminate()
-        try:
-            process.wait(timeout=5)
-        except subprocess.TimeoutExpired:
-            process.kill()
+        if process.returncode is None:
+            process.terminate()
+            try:
+                await asyncio.wait_for(process.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
             
         del running_processes[pid]
         return {"success": True, "message": f"Program with PID {pid} stopped"}
@@ -243,22 +520,54 @@ def stop_program(pid: int) -> Dict[str, Any]:
         logger.error(f"Program stop error: {str(e)}")
         return {"success": False, "error": str(e)}
 
+async def stop_all_programs():
+    """Stop every tracked program concurrently, so shutdown takes at most one stop timeout"""
+    await asyncio.gather(*(stop_program(pid) for pid in list(running_processes)), return_exceptions=True)
+
 # --- Ollama Integration ---
 
-def connect_to_ollama(model_id: str, config: Dict[str, Any]) -> Dict[str, Any]:
-    """Connect to an Ollama model"""
-    import requests
+async def get_ollama_model_names(ollama_host: str, refresh: bool = False) -> Set[str]:
+    """Get the names of the models available on an Ollama host, cached for OLLAMA_TAGS_TTL"""
+    now = time.monotonic()
+    cached = ollama_tags_cache.get(ollama_host)
+    
+    if cached and not refresh and now - cached[0] < OLLAMA_TAGS_TTL:
+        return cached[1]
     
+    # Concurrent connects (e.g. a batch at startup) share a single tag fetch
+    fetch = ollama_tags_fetches.get(ollama_host)
+    if fetch is None:
+        fetch = asyncio.ensure_future(fetch_ollama_model_names(ollama_host))
+        ollama_tags_fetches[ollama_host] = fetch
+        fetch.add_done_callback(lambda _: ollama_tags_fetches.pop(ollama_host, None))
+    
+    # Shielded so one cancelled caller does not abort the fetch for the others
+    return await asyncio.shield(fetch)
+
+async def fetch_ollama_model_names(ollama_host: str) -> Set[str]:
+    """Fetch the model names from an Ollama host and refresh the cache"""
+    response = await app.state.http.get(f"{ollama_host}/api/tags")
+    
+    # Report HTTP failures (e.g. a 5xx error page) as such, not as a JSON error
+    response.raise_for_status()
+    model_names = {model["name"] for model in orjson.loads(response.content).get("models", [])}
+    
+    ollama_tags_cache[ollama_host] = (time.monotonic(), model_names)
+    return model_names
+
+async def connect_to_ollama(model_id: str, config: Dict[str, Any]) -> Dict[str, Any]:
+    """Connect to an Ollama model"""
     ollama_host = config.get("host", "http://localhost:11434")
     
     # Check if model exists
     try:
-        response = requests.get(f"{ollama_host}/api/tags")
-        available_models = response.json().get("models", [])
+        model_names = await get_ollama_model_names(ollama_host)
         
-        model_exists = any(model["name"] == model_id for model in available_models)
+        if model_id not in model_names:
+            # The model may have been pulled since the list was cached
+            model_names = await get_ollama_model_names(ollama_host, refresh=True)
         
-        if not model_exists:
+        if model_id not in model_names:
             return {
                 "success": False,
                 "error": f"Model {model_id} not found in Ollama"
@@ -280,10 +589,8 @@ def connect_to_ollama(model_id: str, config: Dict[str, Any]) -> Dict[str, Any]:
         logger.error(f"Ollama connection error: {str(e)}")
         return {"success": False, "error": str(e)}
 
-def query_ollama_model(model_id: str, prompt: str) -> Dict[str, Any]:
+async def query_ollama_model(model_id: str, prompt: str, system_prompt: str = None) -> Dict[str, Any]:
     """Query an Ollama model"""
-    import requests
-    
     if model_id not in connected_models:
         return {"success": False, "error": f"Model {model_id} not connected"}
         
@@ -294,17 +601,19 @@ def query_ollama_model(model_id: str, prompt: str) -> Dict[str, Any]:
         
     ollama_host = model_info["host"]
     
+    payload = {
+        "model": model_id,
+        "prompt": prompt,
+        "stream": False
+    }
+    
+    if system_prompt:
+        payload["system"] = system_prompt
+    
     try:
-        response = requests.post(
-            f"{ollama_host}/api/generate",
-            json={
-                "model": model_id,
-                "prompt": prompt,
-                "stream": False
-            }
-        )
+        response = await app.state.http.post(f"{ollama_host}/api/generate", json=payload)
         
-        result = response.json()
+        result = orjson.loads(response.content)
         return {
             "success": True,
             "response": result.get("response", ""),
@@ -317,7 +626,7 @@ def query_ollama_model(model_id: str, prompt: str) -> Dict[str, Any]:
 
 # --- Claude Desktop Integration ---
 
-def connect_to_claude_desktop(model_id: str, config: Dict[str, Any]) -> Dict[str, Any]:
+async def connect_to_claude_desktop(model_id: str, config: Dict[str, Any]) -> Dict[str, Any]:
     """Connect to Claude Desktop"""
     if not CLAUDE_DESKTOP_AVAILABLE:
         return {
@@ -332,11 +641,17 @@ def connect_to_claude_desktop(model_id: str, config: Dict[str, Any]) -> Dict[str
         claude_connector = ClaudeDesktopConnector(api_url=api_url)
         
         # Connect to Claude Desktop
-        result = claude_connector.connect()
+        result = await claude_connector.connect()
         
         if not result.get("success", False):
+            await claude_connector.aclose()
             return result
             
+        # Reconnecting replaces the previous connector; release its connections
+        previous = connected_models.get(model_id)
+        if previous and "connector" in previous:
+            await previous["connector"].aclose()
+            
         # Register model in connected models
         connected_models[model_id] = {
             "type": "claude",
@@ -355,7 +670,7 @@ def connect_to_claude_desktop(model_id: str, config: Dict[str, Any]) -> Dict[str
         logger.error(f"Claude Desktop connection error: {str(e)}")
         return {"success": False, "error": str(e)}
 
-def query_claude_desktop_model(model_id: str, prompt: str, system_prompt: str = None) -> Dict[str, Any]:
+async def query_claude_desktop_model(model_id: str, prompt: str, system_prompt: str = None) -> Dict[str, Any]:
     """Query a Claude Desktop model"""
     if model_id not in connected_models:
         return {"success": False, "error": f"Model {model_id} not connected"}
@@ -375,7 +690,7 @@ def query_claude_desktop_model(model_id: str, prompt: str, system_prompt: str =
         temperature = model_info.get("config", {}).get("temperature", 0.7)
         max_tokens = model_info.get("config", {}).get("max_tokens", 1000)
         
-        result = claude_connector.generate(
+        result = await claude_connector.generate(
             prompt=prompt,
             system_prompt=system_prompt,
             temperature=temperature,
@@ -388,6 +703,116 @@ def query_claude_desktop_model(model_id: str, prompt: str, system_prompt: str =
         logger.error(f"Claude Desktop query error: {str(e)}")
         return {"success": False, "error": str(e)}
 
+# --- Task Tracking ---
+
+def get_task(task_id: str) -> TaskRecord:
+    """Look up a task record, marking it as recently used"""
+    if task_id not in tasks:
+        raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+    
+    tasks.move_to_end(task_id)
+    return tasks[task_id]
+
+async def task_worker(worker_id: int):
+    """Run queued tasks one at a time until cancelled"""
+    task_queue = app.state.task_queue
+    
+    while True:
+        task_id, job = await task_queue.get()
+        app.state.worker_tasks[worker_id] = task_id
+        
+        try:
+            await job()
+        except Exception as e:
+            logger.error(f"Task worker {worker_id} error: {str(e)}")
+        finally:
+            app.state.worker_tasks[worker_id] = None
+            task_queue.task_done()
+
+# --- Task Coalescing ---
+
+def coalesce_key(task_type: str, data: Dict[str, Any]) -> Optional[str]:
+    """Key identifying duplicates of an idempotent task, or None if the task must always run"""
+    if task_type == "file_operation":
+        if data.get("operation") not in COALESCED_FILE_OPERATIONS:
+            return None
+    elif task_type not in COALESCED_TASK_TYPES:
+        return None
+    
+    try:
+        return hashlib.sha256(orjson.dumps([task_type, data], option=orjson.OPT_SORT_KEYS)).hexdigest()
+    except orjson.JSONEncodeError:
+        return None
+
+def invalidate_inflight_file_tasks(path: str):
+    """Stop new reads/listings from joining running ones that a change to path may make stale"""
+    changed = os.path.abspath(path)
+    
+    for key, task_path in list(inflight_file_paths.items()):
+        # The path itself, a directory listing that may include it, or
+        # anything beneath it (e.g. a deleted directory)
+        if (task_path == changed
+                or changed.startswith(os.path.join(task_path, ""))
+                or task_path.startswith(os.path.join(changed, ""))):
+            inflight_tasks.pop(key, None)
+            del inflight_file_paths[key]
+
+# --- Task Dispatch ---
+
+async def handle_system_command(data: Dict[str, Any]) -> Dict[str, Any]:
+    return await execute_system_command(SystemCommand(**data))
+
+async def handle_file_operation(data: Dict[str, Any]) -> Dict[str, Any]:
+    # Blocking disk I/O (reads, writes, rmtree, directory walks) runs in the
+    # thread pool so slow disks don't stall the event loop
+    return await run_in_threadpool(execute_file_operation, FileOperation(**data))
+
+async def handle_program_control(data: Dict[str, Any]) -> Dict[str, Any]:
+    action = data.get("action")
+    
+    if action == "start":
+        return await start_program(data.get("program_path"), data.get("args", []))
+    elif action == "stop":
+        return await stop_program(data.get("pid"))
+    else:
+        return {"success": False, "error": f"Unknown program action: {action}"}
+
+async def handle_model_query(data: Dict[str, Any]) -> Dict[str, Any]:
+    target_model = data.get("target_model")
+    prompt = data.get("prompt")
+    
+    if not target_model or not prompt:
+        return {"success": False, "error": "Missing target_model or prompt"}
+        
+    if target_model not in connected_models:
+        return {"success": False, "error": f"Model {target_model} not connected"}
+        
+    model_type = connected_models[target_model]["type"]
+    query = MODEL_QUERIERS.get(model_type)
+    
+    if query is None:
+        return {"success": False, "error": f"Unsupported model type: {model_type}"}
+        
+    return await query(target_model, prompt, data.get("system_prompt"))
+
+# Dispatch tables; add an entry here to support a new model backend or task type
+MODEL_CONNECTORS = {
+    "ollama": connect_to_ollama,
+    "claude": connect_to_claude_desktop
+}
+
+MODEL_QUERIERS = {
+    "ollama": query_ollama_model,
+    "claude": query_claude_desktop_model
+}
+
+TASK_HANDLERS = {
+    "system_command": handle_system_command,
+    "file_operation": handle_file_operation,
+    "program_control": handle_program_control,
+    "model_query": handle_model_query
+}
+
 # --- API Endpoints ---
 
 @app.post("/connect_model", response_model=Dict[str, Any])
@@ -400,95 +825,122 @@ async def connect_model(
     model_type = request.model_type
     config = request.config
     
-    if model_type == "ollama":
-        result = connect_to_ollama(model_id, config)
-    elif model_type == "claude":
-        result = connect_to_claude_desktop(model_id, config)
-    else:
-        result = {
+    connect = MODEL_CONNECTORS.get(model_type)
+    
+    if connect is None:
+        return {
             "success": False,
             "error": f"Unsupported model type: {model_type}"
         }
         
-    return result
+    return await connect(model_id, config)
+
+@app.post("/connect_models", response_model=Dict[str, Any])
+async def connect_models(
+    request: ModelsConnectRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """Connect several models of one type in a single request"""
+    connect = MODEL_CONNECTORS.get(request.model_type)
+    
+    if connect is None:
+        return {
+            "success": False,
+            "error": f"Unsupported model type: {request.model_type}"
+        }
+    
+    # Connects run concurrently; Ollama ones share a single tag fetch
+    results = await asyncio.gather(*(connect(model_id, request.config) for model_id in request.model_ids))
+    
+    return {
+        "success": True,
+        "results": [
+            {"model_id": model_id, "success": result.get("success", False), "error": result.get("error")}
+            for model_id, result in zip(request.model_ids, results)
+        ]
+    }
 
 @app.post("/execute_task", response_model=TaskResponse)
 async def execute_task(
     request: TaskRequest,
-    background_tasks: BackgroundTasks,
     api_key: str = Depends(verify_api_key)
 ):
     """Execute a task requested by an AI model"""
-    task_id = f"task_{int(time.time())}_{len(tasks) + 1}"
     model_id = request.model_id
     task_type = request.task_type
     data = request.data
     
-    # Initialize task
-    tasks[task_id] = {
-        "status": "processing",
-        "model_id": model_id,
-        "task_type": task_type,
-        "data": data,
-        "result": None,
-        "error": None
-    }
+    handler = TASK_HANDLERS.get(task_type)
+    
+    if handler is None:
+        raise HTTPException(status_code=400, detail=f"Unknown task type: {task_type}")
+    
+    # Later reads of a path being changed must not join reads started
+    # before the change
+    if task_type == "file_operation" and data.get("operation") in MUTATING_FILE_OPERATIONS and "path" in data:
+        invalidate_inflight_file_tasks(str(data["path"]))
+    
+    # An identical idempotent task is already running; share its result
+    key = coalesce_key(task_type, data)
+    
+    existing_id = inflight_tasks.get(key) if key is not None else None
+    
+    if existing_id in tasks:
+        return tasks[existing_id].to_response(existing_id)
+    
+    if app.state.task_queue.full():
+        raise HTTPException(status_code=503, detail="Task queue is full, try again later")
+    
+    task_id = uuid.uuid4().hex
+    
+    # Initialize task, dropping the least recently used finished records
+    # beyond MAX_TASKS. Running tasks are kept so their ids stay valid for
+    # /task_wait and coalescing
+    task = TaskRecord(model_id=model_id, task_type=task_type, data=data)
+    tasks[task_id] = task
+    
+    excess = len(tasks) - MAX_TASKS
+    if excess > 0:
+        stale = []
+        for old_id, record in tasks.items():
+            if record.done.is_set():
+                stale.append(old_id)
+                if len(stale) == excess:
+                    break
+        
+        for old_id in stale:
+            del tasks[old_id]
+    
+    if key is not None:
+        inflight_tasks[key] = task_id
+        
+        if task_type == "file_operation":
+            inflight_file_paths[key] = os.path.abspath(str(data.get("path", "")))
     
     async def process_task():
         try:
-            if task_type == "system_command":
-                command = SystemCommand(**data)
-                result = execute_system_command(command)
-                
-            elif task_type == "file_operation":
-                operation = FileOperation(**data)
-                result = execute_file_operation(operation)
-                
-            elif task_type == "program_control":
-                action = data.get("action")
-                
-                if action == "start":
-                    result = start_program(data.get("program_path"), data.get("args", []))
-                elif action == "stop":
-                    result = stop_program(data.get("pid"))
-                else:
-                    result = {"success": False, "error": f"Unknown program action: {action}"}
+            result = await handler(data)
             
-            elif task_type == "model_query":
-                target_model = data.get("target_model")
-                prompt = data.get("prompt")
-                system_prompt = data.get("system_prompt")
-                
-                if not target_model or not prompt:
-                    result = {"success": False, "error": "Missing target_model or prompt"}
-                else:
-                    # Get model type
-                    if target_model not in connected_models:
-                        result = {"success": False, "error": f"Model {target_model} not connected"}
-                    else:
-                        model_type = connected_models[target_model]["type"]
-                        
-                        if model_type == "ollama":
-                            result = query_ollama_model(target_model, prompt)
-                        elif model_type == "claude":
-                            result = query_claude_desktop_model(target_model, prompt, system_prompt)
-                        else:
-                            result = {"success": False, "error": f"Unsupported model type: {model_type}"}
-            
-            else:
-                result = {"success": False, "error": f"Unknown task type: {task_type}"}
-                
             # Update task status
-            tasks[task_id]["status"] = "completed" if result.get("success", False) else "failed"
-            tasks[task_id]["result"] = result
+            task.status = "completed" if result.get("success", False) else "failed"
+            task.result = result
             
         except Exception as e:
             logger.error(f"Task processing error: {str(e)}")
-            tasks[task_id]["status"] = "failed"
-            tasks[task_id]["error"] = str(e)
+            task.status = "failed"
+            task.error = str(e)
+            
+        finally:
+            # The key may have been handed to a newer task in the meantime
+            if key is not None and inflight_tasks.get(key) == task_id:
+                del inflight_tasks[key]
+                inflight_file_paths.pop(key, None)
+            
+            # Wake up any clients long-polling this task
+            task.done.set()
     
-    # Process task in background
-    background_tasks.add_task(process_task)
+    # Hand the task to the worker pool
+    app.state.task_queue.put_nowait((task_id, process_task))
     
     return TaskResponse(
         task_id=task_id,
@@ -503,18 +955,153 @@ async def get_task_status(
     api_key: str = Depends(verify_api_key)
 ):
     """Get the status of a task"""
-    if task_id not in tasks:
-        raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+    return get_task(task_id).to_response(task_id)
+
+@app.get("/task_wait/{task_id}", response_model=TaskResponse)
+async def wait_for_task(
+    task_id: str,
+    timeout: float = 30.0,
+    api_key: str = Depends(verify_api_key)
+):
+    """Wait for a task to finish (long-poll), returning its status on completion or timeout"""
+    task = get_task(task_id)
+    
+    try:
+        await asyncio.wait_for(task.done.wait(), timeout=max(0.0, min(timeout, MAX_TASK_WAIT)))
+    except asyncio.TimeoutError:
+        pass
+    
+    return task.to_response(task_id)
+
+@app.post("/task_status_batch", response_model=Dict[str, TaskResponse])
+async def get_task_status_batch(
+    task_ids: List[str],
+    wait: float = 0.0,
+    api_key: str = Depends(verify_api_key)
+):
+    """Get the status of several tasks in one round-trip, optionally waiting until all have finished"""
+    found = {task_id: tasks[task_id] for task_id in task_ids if task_id in tasks}
+    pending = [task.done.wait() for task in found.values() if not task.done.is_set()]
+    
+    if pending and wait > 0:
+        try:
+            await asyncio.wait_for(asyncio.gather(*pending), timeout=min(wait, MAX_TASK_WAIT))
+        except asyncio.TimeoutError:
+            pass
+    else:
+        # Nothing to wait on; don't leave the wait() coroutines unawaited
+        for coro in pending:
+            coro.close()
+    
+    # Unknown task IDs are left out of the result
+    return {task_id: task.to_response(task_id) for task_id, task in found.items()}
+
+@app.get("/file_stream")
+async def file_stream(
+    path: str,
+    offset: int = 0,
+    length: Optional[int] = None,
+    api_key: str = Depends(verify_api_key)
+):
+    """Stream a file's raw bytes (optionally a byte range) without buffering it or encoding it as JSON"""
+    file_path = Path(path)
+    
+    if not file_path.is_file():
+        raise HTTPException(status_code=404, detail="File not found")
         
-    task = tasks[task_id]
+    if offset < 0 or (length is not None and length < 0):
+        raise HTTPException(status_code=400, detail="offset and length must be non-negative")
     
-    return TaskResponse(
-        task_id=task_id,
-        status=task["status"],
-        result=task.get("result"),
-        error=task.get("error")
+    size = max(0, file_path.stat().st_size - offset)
+    if length is not None:
+        size = min(size, length)
+    
+    return StreamingResponse(
+        iter_file(file_path, offset, length),
+        media_type="application/octet-stream",
+        headers={"Content-Length": str(size)}
     )
 
+@app.get("/list_stream")
+async def list_stream(
+    path: str,
+    max_depth: int = 3,
+    max_entries: Optional[int] = None,
+    api_key: str = Depends(verify_api_key)
+):
+    """Stream a directory listing as newline-delimited JSON while the tree is being walked"""
+    dir_path = Path(path)
+    
+    if not dir_path.is_dir():
+        raise HTTPException(status_code=404, detail="Directory not found")
+    
+    entries = itertools.islice(iter_directory(str(dir_path), max_depth), max_entries)
+    
+    return StreamingResponse(
+        (orjson.dumps(entry) + b"\n" for entry in entries),
+        media_type="application/x-ndjson"
+    )
+
+@app.put("/file_upload", response_model=Dict[str, Any])
+async def file_upload(
+    path: str,
+    request: Request,
+    api_key: str = Depends(verify_api_key)
+):
+    """Write the raw request body to a file, streaming it to disk in chunks"""
+    file_path = Path(path)
+    written = 0
+    
+    invalidate_inflight_file_tasks(path)
+    
+    try:
+        await run_in_threadpool(file_path.parent.mkdir, parents=True, exist_ok=True)
+        f = await run_in_threadpool(open, file_path, "wb")
+    except OSError as e:
+        return {"success": False, "error": str(e)}
+    
+    try:
+        buffer = bytearray()
+        
+        async for chunk in request.stream():
+            buffer += chunk
+            
+            if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                await run_in_threadpool(f.write, buffer)
+                written += len(buffer)
+                buffer = bytearray()
+        
+        if buffer:
+            await run_in_threadpool(f.write, buffer)
+            written += len(buffer)
+            
+    except OSError as e:
+        logger.error(f"File upload error: {str(e)}")
+        return {"success": False, "error": str(e)}
+    finally:
+        await run_in_threadpool(f.close)
+    
+    return {"success": True, "bytes_written": written}
+
+@app.get("/workers", response_model=Dict[str, Any])
+async def list_workers(
+    api_key: str = Depends(verify_api_key)
+):
+    """Show the task queue depth and what each worker is running"""
+    return {
+        "success": True,
+        "queued": app.state.task_queue.qsize(),
+        "subprocess_slots": {
+            "limit": MAX_SUBPROCESSES,
+            "acquired": subprocess_stats["acquired"],
+            "wait_seconds": round(subprocess_stats["wait_seconds"], 3)
+        },
+        "workers": [
+            {"worker_id": worker_id, "task_id": task_id}
+            for worker_id, task_id in enumerate(app.state.worker_tasks)
+        ]
+    }
+
 @app.get("/list_models", response_model=Dict[str, Any])
 async def list_models(
     api_key: str = Depends(verify_api_key)
@@ -548,7 +1135,8 @@ async def disconnect_model(
     if model_info["type"] == "claude":
         if "connector" in model_info:
             try:
-                model_info["connector"].disconnect()
+                await model_info["connector"].disconnect()
+                await model_info["connector"].aclose()
             except Exception as e:
                 logger.error(f"Error disconnecting from Claude Desktop: {str(e)}")
     
@@ -561,13 +1149,14 @@ async def disconnect_model(
 
 def cleanup():
     """Cleanup function to terminate all running processes"""
-    for pid, process in running_processes.items():
+    # Runs from a signal handler, so only send the signal; the graceful
+    # shutdown path (lifespan) waits and escalates to kill
+    for pid, process in list(running_processes.items()):
         try:
-            process.terminate()
-            try:
-                process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                process.kill()
+            if process.returncode is None:
+                process.terminate()
+        except ProcessLookupError:
+            pass
         except Exception as e:
             logger.error(f"Error terminating process {pid}: {str(e)}")
 
@@ -578,8 +1167,9 @@ def signal_handler(sig, frame):
     sys.exit(0)
 
 # Register signal handlers
-signal.signal(signal.SIGINT, signal_handler)
-signal.signal(signal.SIGTERM, signal_handler)
+if not IS_POOL_HELPER:
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
 
 # Main entry point
 if __name__ == "__main__":
@@ -597,4 +1187,17 @@ if __name__ == "__main__":
     else:
         logger.warning("Claude Desktop connector not available")
     
-    uvicorn.run(app, host=host, port=port)
\ No newline at end of file
+    # Task state, connected models and tracked programs live in this process,
+    # so more than one worker is only safe when clients don't rely on them
+    # across requests (e.g. a task must be polled on the worker that ran it)
+    workers = int(os.getenv("MCP_WORKERS", "1"))
+    
+    # "auto" picks uvloop and httptools when installed (uvicorn[standard])
+    uvicorn.run(
+        "mcp_server:app" if workers > 1 else app,
+        host=host,
+        port=port,
+        loop="auto",
+        http="auto",
+        workers=workers
+    )
\ No newline at end of file
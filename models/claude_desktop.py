@@ -6,9 +6,10 @@ enabling seamless interaction with the locally installed Claude AI.
 """
 
 import os
-import json
+import asyncio
 import logging
-import requests
+import httpx
+import orjson
 from typing import Dict, Any, Optional, List
 
 # Configure logging
@@ -31,7 +32,15 @@ class ClaudeDesktopConnector:
         self.is_connected = False
         self.model_info = {}
         
-    def connect(self) -> Dict[str, Any]:
+        # Persistent keep-alive client; no read timeout since generation can be slow
+        self._client = httpx.AsyncClient(
+            base_url=api_url,
+            headers=self.headers,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+            timeout=httpx.Timeout(30.0, read=None)
+        )
+        
+    async def connect(self) -> Dict[str, Any]:
         """
         Connect to Claude Desktop
         
@@ -40,13 +49,10 @@ class ClaudeDesktopConnector:
         """
         try:
             # Attempt to get model info
-            response = requests.get(
-                f"{self.api_url}/models/info",
-                headers=self.headers
-            )
+            response = await self._client.get("/models/info")
             
             if response.status_code == 200:
-                self.model_info = response.json()
+                self.model_info = orjson.loads(response.content)
                 self.is_connected = True
                 
                 logger.info(f"Successfully connected to Claude Desktop: {self.model_info.get('model_name', 'Unknown')}")
@@ -72,8 +78,8 @@ class ClaudeDesktopConnector:
                 "error": str(e)
             }
             
-    def generate(self, prompt: str, system_prompt: Optional[str] = None, 
-                temperature: float = 0.7, max_tokens: int = 1000) -> Dict[str, Any]:
+    async def generate(self, prompt: str, system_prompt: Optional[str] = None, 
+                       temperature: float = 0.7, max_tokens: int = 1000) -> Dict[str, Any]:
         """
         Generate a response from Claude Desktop
         
@@ -102,14 +108,10 @@ class ClaudeDesktopConnector:
             if system_prompt:
                 data["system_prompt"] = system_prompt
                 
-            response = requests.post(
-                f"{self.api_url}/generate",
-                headers=self.headers,
-                json=data
-            )
+            response = await self._client.post("/generate", json=data)
             
             if response.status_code == 200:
-                result = response.json()
+                result = orjson.loads(response.content)
                 
                 return {
                     "success": True,
@@ -135,7 +137,7 @@ class ClaudeDesktopConnector:
                 "error": str(e)
             }
             
-    def disconnect(self) -> Dict[str, Any]:
+    async def disconnect(self) -> Dict[str, Any]:
         """
         Disconnect from Claude Desktop
         
@@ -149,6 +151,10 @@ class ClaudeDesktopConnector:
             "success": True,
             "message": "Disconnected from Claude Desktop"
         }
+        
+    async def aclose(self):
+        """Close the HTTP client and its pooled connections"""
+        await self._client.aclose()
 
 # Claude Desktop connection configuration
 DEFAULT_CLAUDE_CONFIG = {
@@ -158,21 +164,25 @@ DEFAULT_CLAUDE_CONFIG = {
 }
 
 # Example usage
-if __name__ == "__main__":
-    logging.basicConfig(level=logging.INFO)
-    
+async def main():
     # Initialize connector
     connector = ClaudeDesktopConnector()
     
     # Connect to Claude Desktop
-    result = connector.connect()
+    result = await connector.connect()
     print(f"Connection result: {result}")
     
     if result.get("success", False):
         # Generate a response
-        generation_result = connector.generate("What is the capital of France?")
+        generation_result = await connector.generate("What is the capital of France?")
         print(f"Generation result: {generation_result}")
         
         # Disconnect
-        disconnect_result = connector.disconnect()
+        disconnect_result = await connector.disconnect()
         print(f"Disconnection result: {disconnect_result}")
+    
+    await connector.aclose()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -7,26 +7,52 @@ including Claude Desktop for local models and Ollama for additional options.
 
 import os
 import sys
-import json
+import random
+import argparse
+import atexit
+import signal
+import socket
+import asyncio
 import logging
+import queue
 import subprocess
 import time
+import orjson
 import requests
-from dotenv import load_dotenv
-from mcp_client import MCPClient
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
 
-# Load environment variables
-load_dotenv()
+# Load environment variables. When the environment already provides the
+# core settings (e.g. containers/CI), .env is not read at all
+REQUIRED_ENV_VARS = ("MCP_HOST", "MCP_PORT", "MCP_API_KEY", "OLLAMA_HOST")
+if not all(name in os.environ for name in REQUIRED_ENV_VARS):
+    from dotenv import load_dotenv
+    load_dotenv(override=False)
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler("mcp_startup.log"),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Callers only enqueue records; a listener thread does the file and console
+# writes off the startup path
+log_queue = queue.SimpleQueue()
+log_formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
+log_handlers = [
+    logging.FileHandler("mcp_startup.log"),
+    logging.StreamHandler(sys.stdout)
+]
+for log_handler in log_handlers:
+    log_handler.setFormatter(log_formatter)
+
+root_logger = logging.getLogger()
+root_logger.setLevel(logging.INFO)
+root_logger.addHandler(QueueHandler(log_queue))
+log_listener = QueueListener(log_queue, *log_handlers, respect_handler_level=True)
+log_listener.start()
+
+# Flush queued records on interpreter exit
+atexit.register(log_listener.stop)
+
 logger = logging.getLogger("mcp_startup")
 
 # MCP Server configuration
@@ -34,13 +60,45 @@ MCP_HOST = os.getenv("MCP_HOST", "0.0.0.0")
 MCP_PORT = int(os.getenv("MCP_PORT", "8000"))
 MCP_API_KEY = os.getenv("MCP_API_KEY", "your-secret-api-key")
 SERVER_URL = f"http://localhost:{MCP_PORT}"
+SERVER_HEADERS = {"Authorization": f"Bearer {MCP_API_KEY}"}
+SERVER_START_TIMEOUT = 10.0
+SERVER_OUTPUT_LOG = "mcp_server.out"
+
+# Maximum number of model connect requests in flight at once
+MAX_CONCURRENT_CONNECTS = 8
+
+# (connect, read) timeout for the direct HTTP checks below, in seconds
+HTTP_TIMEOUT = (1.0, 5.0)
+
+# Timeout for MCPClient calls; longer than HTTP_TIMEOUT since connecting a
+# model makes the server contact the model backend
+MCP_CLIENT_TIMEOUT = 15.0
+
+# Keep-alive probes on pooled sockets, plus a cap on how long sent data may
+# stay unacknowledged where the platform supports it (Linux)
+SOCKET_OPTIONS = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+if hasattr(socket, "TCP_USER_TIMEOUT"):
+    SOCKET_OPTIONS.append((socket.IPPROTO_TCP, socket.TCP_USER_TIMEOUT, 5000))
+
+class StartupHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies SOCKET_OPTIONS to every pooled connection"""
+    
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = HTTPConnection.default_socket_options + SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
+# Shared keep-alive session for the direct HTTP checks below. SERVER_HEADERS
+# is passed per request so the API key is never sent to Ollama or Claude Desktop
+SESSION = requests.Session()
+SESSION.mount("http://", StartupHTTPAdapter(pool_connections=16, pool_maxsize=32))
+SESSION.mount("https://", StartupHTTPAdapter(pool_connections=16, pool_maxsize=32))
 
 # Default model configuration (Claude Desktop)
 DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "claude-desktop")
 DEFAULT_MODEL_TYPE = os.getenv("DEFAULT_MODEL_TYPE", "claude")
 DEFAULT_MODEL_CONFIG_STR = os.getenv("DEFAULT_MODEL_CONFIG", '{"api_url": "http://localhost:5000/api"}')
 try:
-    DEFAULT_MODEL_CONFIG = json.loads(DEFAULT_MODEL_CONFIG_STR)
+    DEFAULT_MODEL_CONFIG = orjson.loads(DEFAULT_MODEL_CONFIG_STR)
 except Exception as e:
     logger.error(f"Error parsing DEFAULT_MODEL_CONFIG: {str(e)}")
     DEFAULT_MODEL_CONFIG = {"api_url": "http://localhost:5000/api"}
@@ -48,59 +106,157 @@ except Exception as e:
 # Ollama configuration
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
 CONNECT_OLLAMA_MODELS = os.getenv("CONNECT_OLLAMA_MODELS", "false").lower() == "true"
+OLLAMA_MODEL_CONFIG = {"host": OLLAMA_HOST}  # Shared by every Ollama connect
+
+# On-disk cache of the Ollama model list, reused across restarts for
+# OLLAMA_TAGS_CACHE_TTL seconds (0 disables it)
+OLLAMA_TAGS_CACHE_TTL = float(os.getenv("OLLAMA_TAGS_CACHE_TTL", "60"))
+OLLAMA_TAGS_CACHE_FILE = Path.home() / ".cache" / "mcp_startup" / "ollama_tags.json"
+
+# Server process started by this script, until startup completes
+server_process = None
+
+# When the server last answered a readiness check; repeat calls to
+# start_mcp_server within SERVER_READY_TTL seconds skip the check
+server_ready_at = None
+SERVER_READY_TTL = 5.0
+
+def stop_server_process():
+    """Terminate the server started by this script if startup did not complete"""
+    if server_process is None or server_process.poll() is not None:
+        return
+    
+    logger.info("Stopping MCP server started by this script...")
+    server_process.terminate()
+    try:
+        server_process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        server_process.kill()
+
+def handle_sigterm(sig, frame):
+    """Exit through the atexit handlers on SIGTERM"""
+    sys.exit(1)
+
+def port_open(host, port):
+    """Check whether something is accepting TCP connections on host:port"""
+    try:
+        with socket.create_connection((host, port), timeout=0.5):
+            return True
+    except OSError:
+        return False
 
 def start_mcp_server():
     """Start the MCP server"""
+    global server_process, server_ready_at
     logger.info("Starting MCP server...")
     
+    if server_ready_at is not None and time.monotonic() - server_ready_at < SERVER_READY_TTL:
+        logger.info("MCP server is already running")
+        return True
+    
     # Check if the server is already running
     try:
-        response = requests.get(f"{SERVER_URL}/list_models", 
-                               headers={"Authorization": f"Bearer {MCP_API_KEY}"})
+        response = SESSION.get(f"{SERVER_URL}/list_models", headers=SERVER_HEADERS, timeout=HTTP_TIMEOUT)
         if response.status_code == 200:
             logger.info("MCP server is already running")
+            server_ready_at = time.monotonic()
             return True
-    except requests.exceptions.ConnectionError:
+    except requests.exceptions.RequestException:
         logger.info("MCP server is not running. Starting it now...")
     
     # Start the server
     try:
-        # Using subprocess to run in the background
-        process = subprocess.Popen(
-            [sys.executable, "mcp_server.py"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
+        # Using subprocess to run in the background. Output goes to a file:
+        # nothing reads a pipe once this script exits, and a full pipe
+        # buffer would block the server on its next write
+        with open(SERVER_OUTPUT_LOG, "ab") as output:
+            process = subprocess.Popen(
+                [sys.executable, "mcp_server.py"],
+                stdin=subprocess.DEVNULL,
+                stdout=output,
+                stderr=subprocess.STDOUT
+            )
+        server_process = process
         
-        # Wait for the server to start
-        for _ in range(10):
-            try:
-                response = requests.get(f"{SERVER_URL}/list_models", 
-                                      headers={"Authorization": f"Bearer {MCP_API_KEY}"})
-                if response.status_code == 200:
-                    logger.info("MCP server started successfully")
-                    return True
-            except requests.exceptions.ConnectionError:
-                time.sleep(1)
+        # Wait for the server to accept connections, probing the port with
+        # jittered exponential backoff (25 ms, 50 ms, ... capped at 0.5 s)
+        delay = 0.025
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
         
-        logger.error("Failed to start MCP server")
+        while not port_open("localhost", MCP_PORT):
+            if process.poll() is not None or time.monotonic() >= deadline:
+                logger.error("Failed to start MCP server")
+                return False
+            
+            time.sleep(delay * random.uniform(0.8, 1.2))
+            delay = min(delay * 2, 0.5)
+        
+        # Confirm with one authenticated request now that the port is up
+        response = SESSION.get(f"{SERVER_URL}/list_models", headers=SERVER_HEADERS, timeout=HTTP_TIMEOUT)
+        if response.status_code == 200:
+            logger.info("MCP server started successfully")
+            server_ready_at = time.monotonic()
+            return True
+        
+        logger.error(f"MCP server returned error: {response.status_code}")
         return False
         
     except Exception as e:
         logger.error(f"Error starting MCP server: {str(e)}")
         return False
 
+def load_ollama_tags_cache():
+    """Load the cached Ollama model list for OLLAMA_HOST, or None"""
+    try:
+        cached = orjson.loads(OLLAMA_TAGS_CACHE_FILE.read_bytes())
+        cached["age"] = time.time() - OLLAMA_TAGS_CACHE_FILE.stat().st_mtime
+    except (OSError, ValueError):
+        return None
+    
+    if cached.get("host") != OLLAMA_HOST:
+        return None
+    return cached
+
+def save_ollama_tags_cache(model_names, etag=None):
+    """Store the Ollama model list for OLLAMA_HOST"""
+    try:
+        OLLAMA_TAGS_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Write to a temporary file first so concurrent startups never read
+        # a half-written cache
+        tmp_file = OLLAMA_TAGS_CACHE_FILE.with_name(f"{OLLAMA_TAGS_CACHE_FILE.name}.{os.getpid()}.tmp")
+        tmp_file.write_bytes(orjson.dumps({"host": OLLAMA_HOST, "etag": etag, "model_names": model_names}))
+        os.replace(tmp_file, OLLAMA_TAGS_CACHE_FILE)
+    except OSError as e:
+        logger.warning(f"Could not write Ollama model cache: {str(e)}")
+
 def check_ollama():
     """Check if Ollama is running and get available models"""
     logger.info("Checking Ollama service...")
     
+    cached = load_ollama_tags_cache() if OLLAMA_TAGS_CACHE_TTL > 0 else None
+    if cached and cached["age"] < OLLAMA_TAGS_CACHE_TTL:
+        model_names = cached["model_names"]
+        logger.info(f"Using cached Ollama model list: {', '.join(model_names)}")
+        return model_names
+    
     try:
-        response = requests.get(f"{OLLAMA_HOST}/api/tags")
+        # Revalidate the cached list when the server supports ETags
+        headers = {"If-None-Match": cached["etag"]} if cached and cached.get("etag") else {}
+        response = SESSION.get(f"{OLLAMA_HOST}/api/tags", headers=headers, timeout=HTTP_TIMEOUT)
+        
+        if response.status_code == 304 and cached:
+            model_names = cached["model_names"]
+            save_ollama_tags_cache(model_names, cached["etag"])
+            
+            logger.info(f"Ollama is running. Available models: {', '.join(model_names)}")
+            return model_names
         
         if response.status_code == 200:
-            models = response.json().get("models", [])
-            model_names = [model["name"] for model in models]
+            model_names = [model["name"] for model in orjson.loads(response.content).get("models", ())]
+            
+            if OLLAMA_TAGS_CACHE_TTL > 0:
+                save_ollama_tags_cache(model_names, response.headers.get("ETag"))
             
             logger.info(f"Ollama is running. Available models: {', '.join(model_names)}")
             return model_names
@@ -122,10 +278,10 @@ def check_claude_desktop():
     api_url = DEFAULT_MODEL_CONFIG.get("api_url", "http://localhost:5000/api")
     
     try:
-        response = requests.get(f"{api_url}/models/info")
+        response = SESSION.get(f"{api_url}/models/info", timeout=HTTP_TIMEOUT)
         
         if response.status_code == 200:
-            model_info = response.json()
+            model_info = orjson.loads(response.content)
             logger.info(f"Claude Desktop is running. Model: {model_info.get('model_name', 'Unknown')}")
             return True
         else:
@@ -139,20 +295,54 @@ def check_claude_desktop():
         logger.error(f"Error connecting to Claude Desktop: {str(e)}")
         return False
 
-def connect_to_ollama_models(client, model_names):
-    """Connect to Ollama models"""
+def probe_ollama_model(model_name):
+    """Check that Ollama can load a model's manifest before connecting it"""
+    try:
+        response = SESSION.post(f"{OLLAMA_HOST}/api/show", json={"model": model_name, "name": model_name}, timeout=HTTP_TIMEOUT)
+        return response.status_code == 200
+    except requests.exceptions.RequestException:
+        return False
+
+async def connect_to_ollama_models(client, model_names):
+    """Connect to Ollama models (probed concurrently, then connected in one batch)"""
     logger.info("Connecting to Ollama models...")
     
     connected_models = []
     
-    for model_name in model_names:
-        logger.info(f"Connecting to model: {model_name}")
-        
-        result = client.connect_model(
-            model_name,
-            "ollama",
-            {"host": OLLAMA_HOST}
-        )
+    # Bounded so a large model list does not flood Ollama at once
+    slots = asyncio.Semaphore(MAX_CONCURRENT_CONNECTS)
+    
+    loop = asyncio.get_running_loop()
+    
+    async def probe_one(model_name):
+        async with slots:
+            return await loop.run_in_executor(None, probe_ollama_model, model_name)
+    
+    # Skip models Ollama cannot show (e.g. missing weights) up front
+    probes = await asyncio.gather(*(probe_one(model_name) for model_name in model_names))
+    
+    live_models = []
+    for model_name, ok in zip(model_names, probes):
+        if ok:
+            live_models.append(model_name)
+        else:
+            logger.error(f"Failed to connect to model {model_name}: Model did not respond to an Ollama probe")
+    
+    if not live_models:
+        await client.aclose()
+        return connected_models
+    
+    try:
+        response = await client.aconnect_models(live_models, "ollama", OLLAMA_MODEL_CONFIG)
+    finally:
+        await client.aclose()
+    
+    if "results" not in response:
+        logger.error(f"Failed to connect to Ollama models: {response.get('error')}")
+        return connected_models
+    
+    for result in response["results"]:
+        model_name = result["model_id"]
         
         if result.get("success", False):
             logger.info(f"Successfully connected to model: {model_name}")
@@ -179,39 +369,75 @@ def connect_to_claude_desktop(client):
         logger.error(f"Failed to connect to Claude Desktop: {result.get('error')}")
         return False
 
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Start the AI MCP server and connect models")
+    parser.add_argument("--skip-claude", action="store_true", help="do not connect to Claude Desktop")
+    parser.add_argument("--skip-ollama", action="store_true", help="do not connect to Ollama models, even as a fallback")
+    return parser.parse_args()
+
 def main():
     """Main function"""
+    global server_process
+    args = parse_args()
     logger.info("Starting AI MCP startup script...")
     
+    # Release pooled connections, and don't leave a half-started server
+    # behind if startup fails or is interrupted
+    atexit.register(SESSION.close)
+    atexit.register(stop_server_process)
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    
     # Start MCP server
     if not start_mcp_server():
         logger.error("Failed to start MCP server. Exiting...")
         return
     
-    # Initialize client
-    client = MCPClient(SERVER_URL, MCP_API_KEY)
+    # Initialize client. Imported here since it pulls in httpx, which only
+    # this part of the script needs
+    from mcp_client import MCPClient
+    client = MCPClient(SERVER_URL, MCP_API_KEY, timeout=MCP_CLIENT_TIMEOUT)
+    
+    connect_ollama = CONNECT_OLLAMA_MODELS
+    
+    # When Ollama will be used regardless of Claude Desktop, look up its
+    # models in the background while Claude Desktop connects
+    ollama_lookup = None
+    if (connect_ollama or args.skip_claude) and not args.skip_ollama:
+        logger.info("Checking for available Ollama models...")
+        ollama_lookup = ThreadPoolExecutor(max_workers=1)
+        ollama_models_future = ollama_lookup.submit(check_ollama)
     
     # Connect to Claude Desktop (primary model)
-    claude_desktop_available = check_claude_desktop()
-    if claude_desktop_available:
-        if connect_to_claude_desktop(client):
-            logger.info("Claude Desktop is now the primary AI model")
-        else:
-            logger.warning("Failed to connect to Claude Desktop as the primary model")
-            # Enable Ollama as fallback if Claude Desktop connection fails
-            CONNECT_OLLAMA_MODELS = True
+    claude_desktop_available = False
+    if args.skip_claude:
+        logger.info("Skipping Claude Desktop")
+        connect_ollama = True
     else:
-        logger.warning("Claude Desktop is not available. Checking Ollama models instead.")
-        # Enable Ollama as fallback if Claude Desktop is not running
-        CONNECT_OLLAMA_MODELS = True
+        claude_desktop_available = check_claude_desktop()
+        if claude_desktop_available:
+            if connect_to_claude_desktop(client):
+                logger.info("Claude Desktop is now the primary AI model")
+            else:
+                logger.warning("Failed to connect to Claude Desktop as the primary model")
+                # Enable Ollama as fallback if Claude Desktop connection fails
+                connect_ollama = True
+        else:
+            logger.warning("Claude Desktop is not available. Checking Ollama models instead.")
+            # Enable Ollama as fallback if Claude Desktop is not running
+            connect_ollama = True
     
     # Connect to Ollama models if enabled or as fallback
-    if CONNECT_OLLAMA_MODELS:
-        logger.info("Checking for available Ollama models...")
-        model_names = check_ollama()
+    if connect_ollama and not args.skip_ollama:
+        if ollama_lookup is not None:
+            model_names = ollama_models_future.result()
+            ollama_lookup.shutdown()
+        else:
+            logger.info("Checking for available Ollama models...")
+            model_names = check_ollama()
         
         if model_names:
-            connected_models = connect_to_ollama_models(client, model_names)
+            connected_models = asyncio.run(connect_to_ollama_models(client, model_names))
             
             if connected_models:
                 logger.info(f"Connected to Ollama models: {', '.join(connected_models)}")
@@ -235,6 +461,9 @@ def main():
     except Exception as e:
         logger.error(f"Error listing connected models: {str(e)}")
     
+    # Startup succeeded; leave the server running after this script exits
+    server_process = None
+    
     logger.info("AI MCP startup complete")
     logger.info(f"Server running at http://{MCP_HOST}:{MCP_PORT}")
     logger.info("Press Ctrl+C to stop")